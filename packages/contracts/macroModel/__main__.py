@@ -0,0 +1,3 @@
+from .macro_model import main
+
+main()
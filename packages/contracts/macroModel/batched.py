@@ -0,0 +1,415 @@
+"""Batched macro model: M scenario paths advanced by the same array operations.
+
+The stages mirror the ones in engine.py, with every scalar of a run (LUSD
+price, pools, fees, fee rates) turned into a length-M vector and the troves of
+all paths stored in padded (M, capacity) arrays with a validity mask. One
+interpreter pass per stage then serves every path.
+
+Path m uses the same exogenous series as ensemble member m of the scalar
+engine. Its endogenous shocks come from streams of its member, so a path
+follows the same distribution as the scalar member but not the same
+trajectory. Every path of a member draws the same shocks, whatever else is in
+the batch: parameter sets compared on a member see common random numbers, and
+results do not depend on how paths are batched.
+"""
+
+import numpy as np
+
+from . import engine as e
+from .recorder import Recorder
+from .rng import RandomStreams
+from .scenarios import build_random_walk, random_walk
+from .trove_index import CCR, MCR
+
+
+def row_sum(values):
+    """Sums of the rows, added left to right so that padding the rows with zeros keeps them exact."""
+    if values.shape[1] == 0:
+        return np.zeros(len(values))
+    return np.cumsum(values, axis=1)[:, -1]
+
+
+class TrovePool:
+    """Troves of M paths in padded arrays; free slots are reused on open."""
+
+    def __init__(self, n_paths, capacity=64):
+        self.valid = np.zeros((n_paths, capacity), dtype=bool)
+        self.ether_quantity = np.zeros((n_paths, capacity))
+        self.supply = np.ones((n_paths, capacity))
+        self.CR_initial = np.ones((n_paths, capacity))
+        self.rational_inattention = np.ones((n_paths, capacity))
+
+    @property
+    def capacity(self):
+        return self.valid.shape[1]
+
+    def count(self):
+        return self.valid.sum(axis=1)
+
+    def total_supply(self):
+        return row_sum(np.where(self.valid, self.supply, 0))
+
+    def aggregates(self, price_ether):
+        """Total collateral, TCR and Recovery Mode flag of every path, as recorded by the scalar engine."""
+        collateral = row_sum(np.where(self.valid, self.ether_quantity, 0))
+        TCR = price_ether * collateral / self.total_supply()
+        return {"collateral": collateral, "TCR": TCR, "recovery_mode": (TCR < CCR).astype(float)}
+
+    def grow(self, capacity):
+        extra = capacity - self.capacity
+        self.valid = np.pad(self.valid, ((0, 0), (0, extra)))
+        self.ether_quantity = np.pad(self.ether_quantity, ((0, 0), (0, extra)))
+        for name in ('supply', 'CR_initial', 'rational_inattention'):
+            setattr(self, name, np.pad(getattr(self, name), ((0, 0), (0, extra)), constant_values=1))
+
+    def open(self, number, ether_quantity, supply, CR_initial, rational_inattention):
+        """Open number[m] troves in path m, taking the first columns of the (M, K) value arrays."""
+        needed = (self.count() + number).max()
+        if needed > self.capacity:
+            self.grow(max(needed, 2 * self.capacity))
+        free = ~self.valid
+        free_rank = np.cumsum(free, axis=1)
+        rows, slots = np.nonzero(free & (free_rank <= number[:, None]))
+        new = free_rank[rows, slots] - 1
+        self.ether_quantity[rows, slots] = ether_quantity[rows, new]
+        self.supply[rows, slots] = supply[rows, new]
+        self.CR_initial[rows, slots] = CR_initial[rows, new]
+        self.rational_inattention[rows, slots] = rational_inattention[rows, new]
+        self.valid[rows, slots] = True
+
+    def sorted_by_nominal_CR(self, rows):
+        """Slot order of the given paths, riskiest first and free slots last."""
+        nominal_CR = np.where(self.valid[rows], self.ether_quantity[rows] / self.supply[rows], np.inf)
+        return np.argsort(nominal_CR, axis=1, kind='stable')
+
+
+class BatchRun:
+    """Exogenous series, random streams and run parameters of a batch of paths.
+
+    `params` maps names in `engine.run_parameters` to a value shared by every
+    path or to one value per path. Paths of the same member share one copy of
+    its exogenous series, read from the scenario cache when `cache` is set.
+    `sampling` draws the ether shocks as in `engine.new_run`.
+    """
+
+    def __init__(self, seed, members, params=None, cache=False, sampling="iid"):
+        params = params or {}
+        unknown = set(params) - set(e.run_parameters)
+        if unknown:
+            raise ValueError(f"unknown run parameters: {sorted(unknown)}")
+        self.members = np.asarray(members)
+        self.n_paths = len(self.members)
+        walk = random_walk if cache else build_random_walk
+        unique, rows = np.unique(self.members, return_inverse=True)
+        self.rows = rows
+        self.streams = [RandomStreams(seed, int(m)) for m in unique]
+        self._per_step = {}
+        self.price_ether = np.stack([walk('price_ether', e.period, e.price_ether_initial, e.sd_ether, e.drift_ether, seed, int(m), sampling) for m in unique])[rows]
+        self.natural_rate = np.stack([walk('natural_rate', e.period, e.natural_rate_initial, e.sd_natural_rate, 0, seed, int(m)) for m in unique])[rows]
+        self.price_LQTY = np.stack([walk('price_LQTY', e.month, e.price_LQTY_initial, e.sd_LQTY, e.drift_LQTY, seed, int(m)) for m in unique])[rows]
+        for name in e.run_parameters:
+            value = np.asarray(params.get(name, getattr(e, name)), dtype=float)
+            setattr(self, name, np.broadcast_to(value, (self.n_paths,)).copy())
+
+    def generators(self, stage, step):
+        """One generator of the stage and step per member of the batch."""
+        return [streams.at('batched/' + stage, step) for streams in self.streams]
+
+    def draw(self, generators, method, *args, width=None):
+        """Draws of `method` from the members' generators, one per path or one row of `width` per path.
+
+        Rows are prefixes of the same per-member sequence, so a path's draws do
+        not depend on `width` being set by other paths.
+        """
+        size = () if width is None else (width,)
+        return np.stack([getattr(generator, method)(*args, size=size) for generator in generators])[self.rows]
+
+    def per_step(self, stage, step, method, *args):
+        """Draw of `method` for every path at `step`, from a sequence drawn once for the member's whole run."""
+        key = (stage, method, args)
+        draws = self._per_step.get(key)
+        if draws is None:
+            n_steps = self.price_ether.shape[1]
+            draws = np.stack([getattr(streams.generator(f'batched/{stage}/{method}'), method)(*args, size=n_steps) for streams in self.streams])
+            draws = self._per_step[key] = np.ascontiguousarray(draws.T)
+        return draws[step, self.rows]
+
+
+def liquidate_troves(run, troves, index, data):
+    price_ether_current = run.price_ether[:, index]
+    price_LUSD_previous = data['Price_LUSD'][index-1]
+    stability_pool_previous = data['stability'][index-1]
+
+    CR_current = price_ether_current[:, None] * troves.ether_quantity / troves.supply
+    liquidated = troves.valid & (CR_current < MCR)
+    troves.valid &= ~liquidated
+    debt_liquidated = row_sum(np.where(liquidated, troves.supply, 0))
+    ether_liquidated = row_sum(np.where(liquidated, troves.ether_quantity, 0))
+    n_liquidate = liquidated.sum(axis=1)
+
+    liquidation_gain = ether_liquidated*price_ether_current - debt_liquidated*price_LUSD_previous
+    airdrop_gain = data['price_LQTY'][index-1] * e.quantity_LQTY_airdrop
+
+    shock_return = run.per_step('liquidate_troves', index, 'normal', 0, e.sd_return)
+    if index <= e.day:
+        return_stability = e.initial_return*(1+shock_return)
+    elif index <= e.month:
+        return_stability = np.minimum(0.5, 365*(data.window_sum('liquidation_gain', e.day)+data.window_sum('airdrop_gain', e.day))/(price_LUSD_previous*stability_pool_previous))
+    else:
+        return_stability = (365/30)*(data.window_sum('liquidation_gain', e.month)+data.window_sum('airdrop_gain', e.month))/(price_LUSD_previous*stability_pool_previous)
+    return [CR_current, return_stability, debt_liquidated, ether_liquidated, liquidation_gain, airdrop_gain, n_liquidate]
+
+
+def close_troves(run, troves, index, price_LUSD_previous, active):
+    shock_closetroves = run.per_step('close_troves', index, 'normal', 0, e.sd_closetroves)
+    n_troves = troves.count()
+    if index <= 240:
+        number_closetroves = run.per_step('close_troves', index, 'uniform', 0, 1)
+    else:
+        number_closetroves = np.maximum(0, e.n_steady*(1+shock_closetroves)) + np.where(price_LUSD_previous < 1, run.beta*(1-price_LUSD_previous)*n_troves, 0)
+    number_closetroves = np.where(active, np.minimum(np.rint(number_closetroves), n_troves), 0).astype(int)
+
+    # close the troves holding the smallest random keys of their path
+    rows = np.flatnonzero(number_closetroves > 0)
+    keys = run.draw(run.generators('close_troves', index), 'random', width=troves.capacity)[rows]
+    keys[~troves.valid[rows]] = np.inf
+    ranks = np.empty(keys.shape, dtype=int)
+    np.put_along_axis(ranks, np.argsort(keys, axis=1), np.arange(troves.capacity), axis=1)
+    troves.valid[rows] &= ranks >= number_closetroves[rows, None]
+    return number_closetroves
+
+
+def adjust_troves(run, troves, index, CR_current):
+    ratio = run.per_step('adjust_troves', index, 'uniform', 0, 1)[:, None]
+    p = run.draw(run.generators('adjust_troves', index), 'uniform', 0, 1, width=troves.capacity)
+    price_ether_current = run.price_ether[:, index, None]
+
+    check = (CR_current-troves.CR_initial)/(troves.CR_initial*troves.rational_inattention)
+    out_of_band = troves.valid & ((check < -1) | (check > 2))
+
+    #A part of the troves are adjusted by adjusting debt
+    adjust_debt = (p >= ratio) & out_of_band
+    supply_new = np.where(adjust_debt, price_ether_current*troves.ether_quantity/troves.CR_initial, troves.supply)
+    issuance_LUSD_adjust = run.rate_issuance * row_sum(np.where(adjust_debt & (check > 2), supply_new - troves.supply, 0))
+    #Another part of the troves are adjusted by adjusting collaterals
+    adjust_collateral = (p < ratio) & out_of_band
+    troves.ether_quantity = np.where(adjust_collateral, troves.CR_initial*troves.supply/price_ether_current, troves.ether_quantity)
+    troves.supply = supply_new
+    return issuance_LUSD_adjust
+
+
+def open_troves(run, troves, index, price_LUSD_previous, active):
+    shock_opentroves = run.per_step('open_troves', index, 'normal', 0, e.sd_opentroves)
+    if index <= 0:
+        number_opentroves = np.full(run.n_paths, e.initial_open)
+    else:
+        number_opentroves = np.maximum(0, e.n_steady*(1+shock_opentroves)) + np.where(price_LUSD_previous > 1 + run.rate_issuance, run.alpha*(price_LUSD_previous-run.rate_issuance-1)*troves.count(), 0)
+    number_opentroves = np.where(active, np.rint(number_opentroves), 0).astype(int)
+
+    # every distribution has its own stream, so a path's values do not depend on the batch's largest count
+    size = (run.n_paths, number_opentroves.max())
+    CR_ratio = e.distribution_parameter1_CR + e.distribution_parameter2_CR * run.draw(run.generators('open_troves/CR', index), 'chisquare', e.distribution_parameter3_CR, width=size[1])
+    quantity_ether = run.draw(run.generators('open_troves/ether_quantity', index), 'gamma', e.distribution_parameter1_ether_quantity, e.distribution_parameter2_ether_quantity, width=size[1])
+    rational_inattention = run.draw(run.generators('open_troves/inattention', index), 'gamma', e.distribution_parameter1_inattention, e.distribution_parameter2_inattention, width=size[1])
+    supply_trove = run.price_ether[:, index, None] * quantity_ether / CR_ratio
+
+    troves.open(number_opentroves, quantity_ether, supply_trove, CR_ratio, rational_inattention)
+    opened = np.arange(size[1]) < number_opentroves[:, None]
+    issuance_LUSD_open = run.rate_issuance * row_sum(np.where(opened, supply_trove, 0))
+    return [number_opentroves, issuance_LUSD_open]
+
+
+def stability_update(run, stability_pool_previous, return_previous, index):
+    shock_stability = run.per_step('stability_update', index, 'normal', 0, e.sd_stability)
+    drift = e.drift_stability if index <= e.month else 1
+    return stability_pool_previous*(drift+shock_stability)*(1+return_previous-run.natural_rate[:, index])**run.theta
+
+
+def redeem_troves(troves, rows, redemption_pool, price_ether):
+    """Redeem redemption_pool[i] LUSD against the riskiest troves of path rows[i]."""
+    order = troves.sorted_by_nominal_CR(rows)
+    valid = np.take_along_axis(troves.valid[rows], order, axis=1)
+    redempted = np.cumsum(np.where(valid, np.take_along_axis(troves.supply[rows], order, axis=1), 0), axis=1)
+    closed = valid & (redempted <= redemption_pool[:, None])
+    n_redempt = closed.sum(axis=1)
+    fully_redempted = np.where(n_redempt > 0, np.take_along_axis(redempted, np.maximum(n_redempt - 1, 0)[:, None], axis=1)[:, 0], 0)
+
+    troves.valid[rows[:, None], order] &= ~closed
+    partial = n_redempt < valid.sum(axis=1)
+    residual = np.where(partial, redemption_pool - fully_redempted, 0)
+    boundary = order[np.arange(len(rows)), np.minimum(n_redempt, troves.capacity - 1)]
+    troves.supply[rows, boundary] -= residual
+    troves.ether_quantity[rows, boundary] -= residual / price_ether
+    return [n_redempt, (fully_redempted + residual) / price_ether]
+
+
+def price_stabilizer(run, troves, index, data, stability_pool, n_open):
+    price_ether_current = run.price_ether[:, index]
+    issuance_LUSD_stabilizer = np.zeros(run.n_paths)
+    redemption_fee = np.zeros(run.n_paths)
+    n_redempt = np.zeros(run.n_paths, dtype=int)
+    ether_redempted = np.zeros(run.n_paths)
+    redemption_pool = np.zeros(run.n_paths)
+    #Calculating Price
+    supply = troves.total_supply()
+    shock_liquidity = run.per_step('liquidity', index, 'normal', 0, e.sd_liquidity)
+    liquidity_pool_previous = data['liquidity'][index-1]
+    price_LUSD_previous = data['Price_LUSD'][index-1]
+    liquidity_demand = liquidity_pool_previous*(e.drift_liquidity+shock_liquidity)
+    price_LUSD_current = price_LUSD_previous*((supply-stability_pool)/liquidity_demand)**(1/run.delta)
+
+    #Liquidity Pool
+    liquidity_pool = supply-stability_pool
+
+    #Ceiling Arbitrageurs
+    ceiling = price_LUSD_current > 1.1 + run.rate_issuance
+    if ceiling.any():
+        supply_wanted = stability_pool+liquidity_demand*((1.1+run.rate_issuance)/price_LUSD_previous)**run.delta
+        supply_trove = np.where(ceiling, supply_wanted - supply, 0)[:, None]
+        CR_ratio = np.full_like(supply_trove, 1.1)
+        troves.open(ceiling.astype(int), supply_trove * CR_ratio / price_ether_current[:, None], supply_trove, CR_ratio, np.full_like(supply_trove, 0.1))
+        issuance_LUSD_stabilizer = run.rate_issuance * supply_trove[:, 0]
+        price_LUSD_current = np.where(ceiling, 1.1 + run.rate_issuance, price_LUSD_current)
+        liquidity_pool = np.where(ceiling, supply_wanted-stability_pool, liquidity_pool)
+        n_open = n_open + ceiling
+
+    #Floor Arbitrageurs
+    floor = price_LUSD_current < 1 - run.rate_redemption
+    shock_redemption = run.per_step('redemption', index, 'normal', 0, e.sd_redemption)
+    if floor.any():
+        redemption_ratio = e.redemption_star * (1+shock_redemption)
+        supply_target = stability_pool+liquidity_demand*((1-run.rate_redemption)/price_LUSD_previous)**run.delta
+        supply_diff = supply - supply_target
+        to_peg = supply_diff < redemption_ratio * liquidity_pool
+        redemption_pool = np.where(floor, np.where(to_peg, supply_diff, redemption_ratio * liquidity_pool), 0)
+        price_LUSD_current = np.where(floor, np.where(to_peg, 1 - run.rate_redemption, price_LUSD_previous * (liquidity_pool/liquidity_demand)**(1/run.delta)), price_LUSD_current)
+
+        rows = np.flatnonzero(floor)
+        n_redempt[rows], ether_redempted[rows] = redeem_troves(troves, rows, redemption_pool[rows], price_ether_current[rows])
+        redemption_fee = run.rate_redemption * redemption_pool
+
+    return [price_LUSD_current, liquidity_pool, issuance_LUSD_stabilizer, redemption_fee, n_redempt, redemption_pool, n_open, ether_redempted]
+
+
+def LQTY_market(run, index, data):
+    quantity_LQTY = (100000000/3)*(1-0.5**(index/e.period))
+    if index <= e.month:
+        price_LQTY_current = run.price_LQTY[:, index-1]
+        annualized_earning = (index/e.month)**0.5*run.per_step('LQTY_market', index, 'normal', 200000000, 500000)
+    else:
+        annualized_earning = 365*(data.window_sum('issuance_fee', e.month)+data.window_sum('redemption_fee', e.month))/30
+        #discountin factor to factor in the risk in early days
+        price_LQTY_current = (index/e.period)*e.PE_ratio*annualized_earning/e.LQTY_total_supply
+    return [price_LQTY_current, annualized_earning, price_LQTY_current * quantity_LQTY]
+
+
+class PathPolicies:
+    """Fee policies of a batch: one engine policy per path, each setting the rates of its own paths."""
+
+    def __init__(self, policies, n_paths):
+        if not isinstance(policies, (list, tuple)):
+            policies = [policies] * n_paths
+        if len(policies) != n_paths:
+            raise ValueError(f"{len(policies)} policies for {n_paths} paths")
+        self.n_paths = n_paths
+        self.groups = []
+        for policy in {id(policy): policy for policy in policies}.values():
+            self.groups.append((policy, np.array([other is policy for other in policies])))
+        self.columns = list(dict.fromkeys(column for policy, _ in self.groups for column in policy.columns))
+
+    def merge(self, values, row):
+        for policy, mask in self.groups:
+            for column, value in values[id(policy)].items():
+                row[column] = np.where(mask, value, row[column])
+        return row
+
+    def initial(self, run):
+        row = {column: np.full(self.n_paths, np.nan) for column in self.columns}
+        return self.merge({id(policy): policy.initial(run) for policy, _ in self.groups}, row)
+
+    def rates(self, run, index, data, supply):
+        rate_issuance, rate_redemption = run.rate_issuance, run.rate_redemption
+        values = {}
+        for policy, mask in self.groups:
+            policy_issuance, policy_redemption, values[id(policy)] = policy.rates(run, index, data, supply)
+            rate_issuance = np.where(mask, policy_issuance, rate_issuance)
+            rate_redemption = np.where(mask, policy_redemption, rate_redemption)
+        row = {column: np.full(self.n_paths, np.nan) for column in self.columns}
+        return rate_issuance, rate_redemption, self.merge(values, row)
+
+
+def simulate_batch(members, seed=e.seed, n_sim=e.n_sim, base_rate_policy=False, params=None, cache=False, policies=None):
+    """Run one path per ensemble member in `members`, with the run parameters in `params`.
+
+    `policies` is one engine fee policy for every path or a list with one per
+    path; it defaults to FixedFees, or BaseRate with `base_rate_policy`.
+    Returns the Recorder, whose columns hold one value per (step, path), and
+    the number of steps each path completed; the steps after a path stopped
+    hold NaN.
+    """
+    run = BatchRun(seed, members, params, cache)
+    M = run.n_paths
+    policies = PathPolicies(policies or (e.BaseRate() if base_rate_policy else e.FixedFees()), M)
+    columns = list(e.initials) + policies.columns
+    data = Recorder(columns, n_sim, width=M)
+    e.track_windows(data)
+    troves = TrovePool(M)
+    active = np.ones(M, dtype=bool)
+    steps = np.full(M, n_sim)
+
+    number_opentroves, issuance_LUSD_open = open_troves(run, troves, 0, np.ones(M), active)
+    supply = troves.total_supply()
+    data.record(0, {**e.initials, **policies.initial(run),
+                    "issuance_fee": issuance_LUSD_open * e.initials["Price_LUSD"], "supply_LUSD": supply,
+                    "liquidity": 0.5*supply, "stability": 0.5*supply, **troves.aggregates(run.price_ether[:, 0])})
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for index in range(1, n_sim):
+            price_LUSD_previous = data['Price_LUSD'][index-1]
+
+            run.rate_issuance, run.rate_redemption, policy_row = policies.rates(run, index, data, troves.total_supply())
+
+            CR_current, return_stability, debt_liquidated, ether_liquidated, liquidation_gain, airdrop_gain, n_liquidate = liquidate_troves(run, troves, index, data)
+            n_close = close_troves(run, troves, index, price_LUSD_previous, active)
+            issuance_LUSD_adjust = adjust_troves(run, troves, index, CR_current)
+            n_open, issuance_LUSD_open = open_troves(run, troves, index, price_LUSD_previous, active)
+            stability_pool = stability_update(run, data['stability'][index-1], return_stability, index)
+            price_LUSD_current, liquidity_pool, issuance_LUSD_stabilizer, redemption_fee, n_redempt, redemption_pool, n_open, ether_redempted = price_stabilizer(run, troves, index, data, stability_pool, n_open)
+
+            #paths stop before recording a negative liquidity pool, as in the scalar engine
+            stopped = active & ~(liquidity_pool >= 0)
+            steps[stopped] = index
+            active &= ~stopped
+
+            price_LQTY_current, annualized_earning, MC_LQTY_current = LQTY_market(run, index, data)
+            new_row = {"Price_LUSD": price_LUSD_current, "Price_Ether": run.price_ether[:, index], "n_open": n_open, "n_close": n_close,
+                       "n_liquidate": n_liquidate, "n_redempt": n_redempt, "ether_redempted": ether_redempted, "n_troves": troves.count(),
+                       "stability": stability_pool, "liquidity": liquidity_pool, "redemption_pool": redemption_pool, "debt_liquidated": debt_liquidated,
+                       "supply_LUSD": troves.total_supply(), "issuance_fee": price_LUSD_current * (issuance_LUSD_adjust + issuance_LUSD_open + issuance_LUSD_stabilizer),
+                       "redemption_fee": redemption_fee, "airdrop_gain": airdrop_gain, "liquidation_gain": liquidation_gain,
+                       "return_stability": return_stability, "annualized_earning": annualized_earning, "MC_LQTY": MC_LQTY_current,
+                       "price_LQTY": price_LQTY_current, **troves.aggregates(run.price_ether[:, index])}
+            new_row.update(policy_row)
+            data.record(index, {column: np.where(active, value, np.nan) for column, value in new_row.items()})
+
+            stopped = active & (price_LUSD_current < 0)
+            steps[stopped] = index + 1
+            active &= ~stopped
+            if not active.any():
+                break
+
+    return [data, steps]
+
+
+def path_frame(data, steps, path):
+    """Series of one path as a DataFrame, like the scalar engine's output."""
+    return data.to_frame(path).iloc[:steps[path]]
+
+
+def simulate_policies(policies, member=0, seed=e.seed, n_sim=e.n_sim, params=None):
+    """Run every policy on its own path over the exogenous series of one member.
+
+    The paths share one copy of the series and advance together, so comparing
+    the policies costs about as much as a single batched run.
+    """
+    return simulate_batch([member] * len(policies), seed, n_sim, params=params, policies=list(policies))
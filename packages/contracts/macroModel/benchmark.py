@@ -0,0 +1,241 @@
+"""Benchmarks of the macro model engine.
+
+Three kinds of benchmarks, run on a grid of trove counts and ensemble sizes:
+
+* `year`: a full run (`engine.n_sim` hours) of every ensemble member, one
+  after the other; the time is per member.
+* the stage micro-benchmarks (`liquidation`, `adjustment`, `opening`,
+  `redemption`, `LQTY_market`): one call of the stage, on a copy of the
+  member's state after a month and a day of simulation. The step is past the
+  first month, so every stage takes its endogenous branch.
+* the ensemble benchmarks, timed for the whole ensemble: `ensemble` is
+  `ensemble.run_ensemble` on a process pool of every core, and `batched` is
+  one `batched.simulate_batch` of all the members' paths. Both start from
+  `engine.initial_open` troves.
+
+For `year` and the stage benchmarks every member starts with the trove count
+instead of `engine.initial_open` troves, and its pools are sized to their
+supply as in `engine.start`.
+
+Results are written as JSON with the machine they ran on and compared against
+a stored baseline. The stored baseline was captured on a 1-CPU host, where the
+process pool runs the members one at a time: `ensemble` times are only
+compared against a baseline with the same `cpu_count`. Run from
+packages/contracts:
+
+    python -m macroModel.benchmark --output benchmark.json --baseline macroModel/benchmarks/baseline.json
+"""
+
+import argparse
+import copy
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from . import engine
+from .batched import simulate_batch
+from .ensemble import run_ensemble
+from .trove_index import redeem_troves
+
+STAGES = ['liquidation', 'adjustment', 'opening', 'redemption', 'LQTY_market']
+TROVE_COUNTS = [10**2, 10**3, 10**4, 10**5, 10**6]
+YEAR_TROVE_COUNTS = [10**2, 10**3, 10**4]
+ENSEMBLE_SIZES = [1, 4]
+ENSEMBLE_BENCHMARKS = ['ensemble', 'batched']
+# benchmarks whose time depends on the number of cores
+PARALLEL = ['ensemble']
+REDEMPTION_SHARE = 0.01
+BASELINE = os.path.join(os.path.dirname(__file__), 'benchmarks', 'baseline.json')
+
+
+def populate(run, troves, n_troves, index):
+    """Open troves drawn like engine.open_troves until the store holds `n_troves`."""
+    number = n_troves - len(troves)
+    if number <= 0:
+        return troves
+    generator = run.rng.generator('benchmark/populate', index)
+    CR_ratios = engine.distribution_parameter1_CR + engine.distribution_parameter2_CR * generator.chisquare(engine.distribution_parameter3_CR, number)
+    quantities_ether = generator.gamma(engine.distribution_parameter1_ether_quantity, engine.distribution_parameter2_ether_quantity, number)
+    rational_inattentions = generator.gamma(engine.distribution_parameter1_inattention, engine.distribution_parameter2_inattention, number)
+    engine.add_troves(run, troves, run.price_ether[index], CR_ratios, quantities_ether, rational_inattentions)
+    return troves
+
+
+def prepare(seed, member, n_troves, until=1, n_sim=engine.n_sim):
+    """Simulation of `member` started with `n_troves` troves and advanced to step `until`."""
+    simulation = engine.start(engine.new_run(seed, member, cache=False), n_sim)
+    troves = populate(simulation.run, simulation.troves, n_troves, 0)
+    supply = troves.total_supply
+    simulation.data.record(0, {"supply_LUSD": supply, "liquidity": 0.5*supply, "stability": 0.5*supply,
+                              **engine.pool_aggregates(troves, simulation.run.price_ether[0])})
+    engine.advance(simulation, until=until)
+    return simulation
+
+
+def stage_call(name, simulation):
+    """Function running stage `name` of the simulation's next step on a given store."""
+    run, data, index = simulation.run, simulation.data, simulation.index
+    price_LUSD_previous = data['Price_LUSD'][index-1]
+    if name == 'liquidation':
+        return lambda troves: engine.liquidate_troves(run, troves, index, data)
+    if name == 'adjustment':
+        return lambda troves: engine.adjust_troves(run, troves, index)
+    if name == 'opening':
+        return lambda troves: engine.open_troves(run, troves, index, price_LUSD_previous)
+    if name == 'redemption':
+        return lambda troves: redeem_troves(troves, REDEMPTION_SHARE * troves.total_supply, run.price_ether[index])
+    if name == 'LQTY_market':
+        return lambda troves: engine.LQTY_market(run, index, data)
+    raise ValueError(f"unknown stage benchmark: {name}")
+
+
+def timings(durations):
+    durations = np.asarray(durations)
+    return {'repeat': len(durations), 'best_s': float(durations.min()),
+            'median_s': float(np.median(durations)), 'mean_s': float(durations.mean())}
+
+
+def bench_stage(name, simulations, repeat=20):
+    """Seconds per call of stage `name`, over `repeat` calls on each of the prepared simulations."""
+    durations = []
+    for simulation in simulations:
+        call = stage_call(name, simulation)
+        for _ in range(repeat):
+            troves = copy.deepcopy(simulation.troves)
+            start = time.perf_counter()
+            call(troves)
+            durations.append(time.perf_counter() - start)
+    return timings(durations)
+
+
+def bench_year(n_troves, ensemble, seed=engine.seed, n_sim=engine.n_sim):
+    """Seconds per member for a full run of `ensemble` members."""
+    durations, steps = [], []
+    for member in range(ensemble):
+        simulation = prepare(seed, member, n_troves, n_sim=n_sim)
+        start = time.perf_counter()
+        engine.advance(simulation)
+        durations.append(time.perf_counter() - start)
+        steps.append(simulation.index)
+    return {**timings(durations), 'steps': int(np.sum(steps))}
+
+
+def bench_ensemble(ensemble, seed=engine.seed, n_sim=engine.n_sim, processes=None):
+    """Seconds for `run_ensemble` of `ensemble` members on `processes` workers (all cores by default)."""
+    start = time.perf_counter()
+    run_ensemble(ensemble, seed, n_sim, processes=processes)
+    return {**timings([time.perf_counter() - start]), 'processes': processes or os.cpu_count()}
+
+
+def bench_batched(ensemble, seed=engine.seed, n_sim=engine.n_sim):
+    """Seconds for one `simulate_batch` of the paths of `ensemble` members."""
+    start = time.perf_counter()
+    _, steps = simulate_batch(list(range(ensemble)), seed, n_sim)
+    return {**timings([time.perf_counter() - start]), 'steps': int(np.sum(steps))}
+
+
+def machine():
+    """Metadata of the machine and code the benchmarks ran on."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'hostname': platform.node(), 'platform': platform.platform(), 'processor': platform.processor() or platform.machine(),
+            'cpu_count': os.cpu_count(), 'python': sys.version.split()[0], 'numpy': np.__version__, 'commit': commit}
+
+
+def run_benchmarks(stages=STAGES, trove_counts=TROVE_COUNTS, year_trove_counts=YEAR_TROVE_COUNTS,
+                   ensemble_sizes=ENSEMBLE_SIZES, repeat=20, seed=engine.seed, n_sim=engine.n_sim, log=None,
+                   ensemble_benchmarks=ENSEMBLE_BENCHMARKS):
+    """Run every benchmark of the grid; returns {'machine': ..., 'results': [...]}."""
+    results = []
+
+    def add(benchmark, n_troves, ensemble, measured):
+        results.append({'benchmark': benchmark, 'n_troves': n_troves, 'ensemble': ensemble, **measured})
+        if log is not None:
+            log(f"{benchmark:>12} {n_troves:>8} troves {ensemble:>3} members  median {measured['median_s']:.3e} s")
+
+    for ensemble in ensemble_sizes:
+        for n_troves in year_trove_counts:
+            add('year', n_troves, ensemble, bench_year(n_troves, ensemble, seed, n_sim))
+        if 'ensemble' in ensemble_benchmarks:
+            add('ensemble', engine.initial_open, ensemble, bench_ensemble(ensemble, seed, n_sim))
+        if 'batched' in ensemble_benchmarks:
+            add('batched', engine.initial_open, ensemble, bench_batched(ensemble, seed, n_sim))
+        for n_troves in trove_counts if stages else []:
+            simulations = [prepare(seed, member, n_troves, engine.month + engine.day) for member in range(ensemble)]
+            for name in stages:
+                add(name, n_troves, ensemble, bench_stage(name, simulations, repeat))
+    return {'machine': machine(), 'config': {'seed': seed, 'n_sim': n_sim, 'repeat': repeat}, 'results': results}
+
+
+def compare(current, baseline, threshold=1.1):
+    """Median time ratios of the benchmarks in both result sets, with the ones slower than `threshold` flagged.
+
+    The `PARALLEL` benchmarks are left out unless both sets ran on the same
+    number of cores.
+    """
+    base = {(r['benchmark'], r['n_troves'], r['ensemble']): r for r in baseline['results']}
+    same_cores = current['machine']['cpu_count'] == baseline['machine']['cpu_count']
+    rows = []
+    for r in current['results']:
+        key = (r['benchmark'], r['n_troves'], r['ensemble'])
+        if key in base and (same_cores or key[0] not in PARALLEL):
+            ratio = r['median_s'] / base[key]['median_s']
+            rows.append({'benchmark': key[0], 'n_troves': key[1], 'ensemble': key[2], 'baseline_s': base[key]['median_s'],
+                         'median_s': r['median_s'], 'ratio': ratio, 'regression': ratio > threshold})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="macroModel.benchmark", description="Benchmark the macro model engine.")
+    parser.add_argument("--stages", nargs="*", default=STAGES, choices=STAGES, help="stage micro-benchmarks to run (default: all)")
+    parser.add_argument("--troves", nargs="+", type=int, default=TROVE_COUNTS, help="trove counts of the stage benchmarks (default: %(default)s)")
+    parser.add_argument("--year-troves", nargs="*", type=int, default=YEAR_TROVE_COUNTS, help="trove counts of the full-year runs (default: %(default)s)")
+    parser.add_argument("--ensemble", nargs="+", type=int, default=ENSEMBLE_SIZES, help="ensemble sizes (default: %(default)s)")
+    parser.add_argument("--ensemble-benchmarks", nargs="*", default=ENSEMBLE_BENCHMARKS, choices=ENSEMBLE_BENCHMARKS, help="whole-ensemble benchmarks to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=20, help="calls of every stage per member (default: %(default)s)")
+    parser.add_argument("--n-sim", type=int, default=engine.n_sim, help="steps of the full-year runs (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=engine.seed, help="seed of the random streams (default: %(default)s)")
+    parser.add_argument("--output", metavar="PATH", default="benchmark.json", help="where to write the results (default: %(default)s)")
+    parser.add_argument("--baseline", metavar="PATH", default=BASELINE, help="results to compare against (default: the stored baseline)")
+    parser.add_argument("--save-baseline", action="store_true", help="also store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=1.1, help="slowdown ratio reported as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.stages, args.troves, args.year_troves, args.ensemble, args.repeat, args.seed, args.n_sim, log=print,
+                             ensemble_benchmarks=args.ensemble_benchmarks)
+    with open(args.output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print("Results written to", args.output)
+
+    regressions = 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"Compared with the baseline of {baseline['machine']['timestamp']} on {baseline['machine']['hostname']} "
+              f"({baseline['machine']['cpu_count']} CPUs, commit {baseline['machine']['commit']}):")
+        if current['machine']['cpu_count'] != baseline['machine']['cpu_count']:
+            print(f"  {', '.join(PARALLEL)} not compared: the baseline ran on a different number of cores")
+        for row in compare(current, baseline, args.threshold):
+            flag = "  REGRESSION" if row['regression'] else ""
+            print(f"{row['benchmark']:>12} {row['n_troves']:>8} troves {row['ensemble']:>3} members  {row['baseline_s']:.3e} -> {row['median_s']:.3e} s  x{row['ratio']:.2f}{flag}")
+            regressions += row['regression']
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(current, f, indent=2)
+        print("Baseline written to", args.baseline)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+"""Checkpoints of macro model runs.
+
+A checkpoint is the pickled `engine.Simulation` between two steps: the run
+with its fee rates, the policy, the recorded series with their rolling sums
+and the trove store. Random draws are keyed by (run, stage, step), so the
+streams have no position to save; a resumed run draws exactly what the
+uninterrupted run would have.
+"""
+
+import os
+import pickle
+
+
+def save_checkpoint(simulation, path):
+    # write to a temporary file first, so a crash never leaves a torn checkpoint
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(simulation, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
@@ -0,0 +1,559 @@
+# -*- coding: utf-8 -*-
+"""Macro model of the LUSD and LQTY markets.
+
+This module only defines the model: its parameters, the stages of one period,
+`simulate`, which runs them for a number of hours, and `run`, which does so
+for a config dict. Importing it has no side effects and only needs NumPy;
+figures live in report.py and the command line entry point in macro_model.py.
+"""
+
+import copy
+
+import numpy as np
+
+from .checkpoint import load_checkpoint, save_checkpoint
+from .profiler import NULL_PROFILER
+from .recorder import Recorder
+from .rng import RandomStreams
+from .scenarios import build_random_walk, random_walk
+from .trove_index import CCR, redeem_troves, undercollateralized
+from .trove_store import TroveStore
+
+#policy functions
+rate_issuance = 0.01
+rate_redemption = 0.01
+base_rate_initial = 0
+#base rate = decay * previous base rate + sensitivity * redeemed share of the supply
+base_rate_decay = 0.98
+base_rate_sensitivity = 0.5
+
+#global variables
+period = 24*365
+month=24*30
+day=24
+
+#ether price
+price_ether_initial = 1000
+sd_ether=0.02
+drift_ether = 0
+
+#LQTY price & airdrop
+price_LQTY_initial = 1
+sd_LQTY=0.005
+drift_LQTY = 0.0035
+#reduced for now. otherwise the initial return too high
+quantity_LQTY_airdrop = 500
+supply_LQTY=[0]
+LQTY_total_supply=100000000
+
+#PE ratio
+PE_ratio = 50
+
+#natural rate
+natural_rate_initial = 0.2
+sd_natural_rate=0.002
+
+#stability pool
+initial_return=0.2
+return_stability=[initial_return]
+sd_return=0.001
+sd_stability=0.001
+drift_stability=1.002
+theta=0.001
+
+#liquidity pool & redemption pool
+sd_liquidity=0.001
+sd_redemption=0.001
+drift_liquidity=1.0003
+redemption_star = 0.8
+delta = -20
+
+#close troves
+sd_closetroves=0.5
+#sensitivity to LUSD price
+beta = 0.2
+
+#open troves
+distribution_parameter1_ether_quantity=10
+distribution_parameter2_ether_quantity=500
+distribution_parameter1_CR = 1.1
+distribution_parameter2_CR = 0.1
+distribution_parameter3_CR = 16
+distribution_parameter1_inattention = 4
+distribution_parameter2_inattention = 0.08
+sd_opentroves=0.5
+n_steady=0.5
+initial_open=10
+
+#sensitivity to LUSD price & issuance fee
+alpha = 0.3
+
+#number of runs in simulation
+n_sim= 8640
+
+#random streams, keyed by (run, stage, step)
+seed = 2021
+
+#parameters a run may override, e.g. in a parameter sweep
+run_parameters = ["rate_issuance", "rate_redemption", "alpha", "beta", "delta", "theta", "base_rate_decay", "base_rate_sensitivity"]
+
+"""# Runs
+
+A run bundles what differs between two simulations with the same parameters:
+the random streams, the exogenous series, the fee rates set by the policy and
+any parameters overridden for this run.
+"""
+
+class Run:
+  def __init__(self, rng, price_ether, natural_rate, price_LQTY, params=None):
+    params = params or {}
+    self.rng = rng
+    self.price_ether = price_ether
+    self.natural_rate = natural_rate
+    #only covers the first month; the endogenous price takes over after it
+    self.price_LQTY = price_LQTY
+    unknown = set(params) - set(run_parameters)
+    if unknown:
+      raise ValueError(f"unknown run parameters: {sorted(unknown)}")
+    for name in run_parameters:
+      setattr(self, name, params.get(name, globals()[name]))
+
+def new_run(seed=seed, member=0, cache=True, params=None, sampling="iid", tilt=None):
+  #ensemble members get their own streams and exogenous series; only cached series are memory-mapped
+  #`sampling` (see scenarios.standard_shocks) decides how the ether shocks of the members are drawn, and a scenarios.Tilt
+  #draws them from an importance sampling proposal instead (see scenarios.log_likelihood_ratio for the path's weight)
+  walk = random_walk if cache else build_random_walk
+  price_ether = walk('price_ether', period, price_ether_initial, sd_ether, drift_ether, seed, member, sampling, tilt)
+  natural_rate = walk('natural_rate', period, natural_rate_initial, sd_natural_rate, 0, seed, member)
+  price_LQTY = walk('price_LQTY', month, price_LQTY_initial, sd_LQTY, drift_LQTY, seed, member)
+  return Run(RandomStreams(seed, member), price_ether, natural_rate, price_LQTY, params)
+
+"""# Troves
+
+Liquidate Troves
+"""
+
+def liquidate_troves(run, troves, index, data):
+  price_ether_current = run.price_ether[index]
+  price_LUSD_previous = data['Price_LUSD'][index-1]
+  price_LQTY_previous = data['price_LQTY'][index-1]
+  stability_pool_previous = data['stability'][index-1]
+
+  liquidated = undercollateralized(troves, price_ether_current)
+  n_liquidate = len(liquidated)
+  debt_liquidated = troves['Supply'][liquidated].sum()
+  ether_liquidated = troves['Ether_Quantity'][liquidated].sum()
+  troves.remove(liquidated)
+
+  liquidation_gain = ether_liquidated*price_ether_current - debt_liquidated*price_LUSD_previous
+  airdrop_gain = price_LQTY_previous * quantity_LQTY_airdrop
+  
+  shock_return = run.rng.generator('liquidate_troves', index).normal(0,sd_return)
+  if index <= day:
+   return_stability = initial_return*(1+shock_return)
+  elif index<=month:
+    #min function to rule out the large fluctuation caused by the large but temporary liquidation gain in a particular period
+    return_stability = min(0.5, 365*(data.window_sum('liquidation_gain', day)+data.window_sum('airdrop_gain', day))/(price_LUSD_previous*stability_pool_previous))
+  else:
+    return_stability = (365/30)*(data.window_sum('liquidation_gain', month)+data.window_sum('airdrop_gain', month))/(price_LUSD_previous*stability_pool_previous)
+  
+  return[troves, return_stability, debt_liquidated, ether_liquidated, liquidation_gain, airdrop_gain, n_liquidate]
+
+"""Close Troves"""
+
+def close_troves(run, troves, index2, price_LUSD_previous):
+  generator = run.rng.generator('close_troves', index2)
+  shock_closetroves = generator.normal(0,sd_closetroves)
+  n_troves = len(troves)
+
+  if index2 <= 240:
+    number_closetroves = generator.uniform(0,1)
+  elif price_LUSD_previous >=1:
+    number_closetroves = max(0, n_steady * (1+shock_closetroves))
+  else:
+    number_closetroves = max(0, n_steady * (1+shock_closetroves)) + run.beta*(1-price_LUSD_previous)*n_troves
+  
+  number_closetroves = int(round(number_closetroves))
+  
+  drops = generator.choice(len(troves), number_closetroves, replace=False)
+  troves.remove(drops)
+  if len(troves) < number_closetroves:
+    number_closetroves = -999
+
+  return[troves, number_closetroves]
+
+"""Adjust Troves"""
+
+def adjust_troves(run, troves, index):
+  #only the troves whose band the ether price may have left are looked at, found with the store's trigger price index
+  generator = run.rng.generator('adjust_troves', index)
+  ratio = generator.uniform(0,1)
+
+  ether_price = run.price_ether[index]
+  slots = troves.crossed(ether_price)
+  n_checked = len(slots)
+  ether_quantity = troves['Ether_Quantity'][slots]
+  CR_initial = troves['CR_initial'][slots]
+  supply = troves['Supply'][slots]
+  check = (ether_price*ether_quantity/supply-CR_initial)/(CR_initial*troves['Rational_inattention'][slots])
+  out_of_band = (check < -1) | (check > 2)
+  slots, ether_quantity, CR_initial, supply, check = slots[out_of_band], ether_quantity[out_of_band], CR_initial[out_of_band], supply[out_of_band], check[out_of_band]
+  p = generator.uniform(0,1,len(slots))
+
+  #A part of the troves are adjusted by adjusting debt
+  adjust_debt = p >= ratio
+  supply_new = np.where(adjust_debt, ether_price*ether_quantity/CR_initial, supply)
+  issuance_LUSD_adjust = run.rate_issuance * (supply_new - supply)[adjust_debt & (check > 2)].sum()
+  #Another part of the troves are adjusted by adjusting collaterals
+  ether_quantity_new = np.where(~adjust_debt, CR_initial*supply/ether_price, ether_quantity)
+
+  troves.update('Supply', supply_new, slots)
+  troves.update('Ether_Quantity', ether_quantity_new, slots)
+  return[troves, issuance_LUSD_adjust, n_checked]
+
+"""Open Troves"""
+
+def add_troves(run, troves, price_ether_current, CR_ratios, quantities_ether, rational_inattentions):
+  #opens a batch of troves in one append to the store and returns their issuance fee
+  supply_troves = price_ether_current * quantities_ether / CR_ratios
+  troves.open(quantities_ether, supply_troves, CR_ratios, rational_inattentions)
+  return run.rate_issuance * supply_troves.sum()
+
+def open_troves(run, troves, index1, price_LUSD_previous):
+  generator = run.rng.generator('open_troves', index1)
+  shock_opentroves = generator.normal(0,sd_opentroves)
+  n_troves = len(troves)
+
+  if index1<=0:
+    number_opentroves = initial_open
+  elif price_LUSD_previous <=1 + run.rate_issuance:
+    number_opentroves = max(0, n_steady * (1+shock_opentroves))
+  else:
+    number_opentroves = max(0, n_steady * (1+shock_opentroves)) + run.alpha*(price_LUSD_previous-run.rate_issuance-1)*n_troves
+  
+  number_opentroves = int(round(float(number_opentroves)))
+
+  CR_ratios = distribution_parameter1_CR + distribution_parameter2_CR * generator.chisquare(distribution_parameter3_CR, number_opentroves)
+  quantities_ether = generator.gamma(distribution_parameter1_ether_quantity, distribution_parameter2_ether_quantity, number_opentroves)
+  rational_inattentions = generator.gamma(distribution_parameter1_inattention, distribution_parameter2_inattention, number_opentroves)
+
+  issuance_LUSD_open = add_troves(run, troves, run.price_ether[index1], CR_ratios, quantities_ether, rational_inattentions)
+
+  return[troves, number_opentroves, issuance_LUSD_open]
+
+"""# LUSD Market
+
+Stability Pool
+"""
+
+def stability_update(run, stability_pool_previous, return_previous, index):
+  shock_stability = run.rng.generator('stability_update', index).normal(0,sd_stability)
+  natural_rate_current = run.natural_rate[index]
+  if index <= month:
+    stability_pool = stability_pool_previous* (drift_stability+shock_stability)* (1+ return_previous- natural_rate_current)**run.theta
+  else:
+    stability_pool = stability_pool_previous* (1+shock_stability)* (1+ return_previous- natural_rate_current)**run.theta
+  return[stability_pool]
+
+"""LUSD Price, liquidity pool, and redemption"""
+
+def price_stabilizer(run, troves, index, data, stability_pool, n_open):
+  price_ether_current = run.price_ether[index]
+  issuance_LUSD_stabilizer = 0
+  redemption_fee = 0
+  n_redempt = 0
+  ether_redempted = 0
+  redemption_pool = 0  
+#Calculating Price
+  supply = troves.total_supply
+  shock_liquidity = run.rng.generator('liquidity', index).normal(0,sd_liquidity)
+  liquidity_pool_previous = float(data['liquidity'][index-1])
+  price_LUSD_previous = float(data['Price_LUSD'][index-1])
+  price_LUSD_current= price_LUSD_previous*((supply-stability_pool)/(liquidity_pool_previous*(drift_liquidity+shock_liquidity)))**(1/run.delta)
+  
+
+#Liquidity Pool
+  liquidity_pool = supply-stability_pool
+
+#Stabilizer
+  #Ceiling Arbitrageurs
+  if price_LUSD_current > 1.1 + run.rate_issuance:
+    #supply_current = sum(troves['Supply'])
+    supply_wanted=stability_pool+liquidity_pool_previous*(drift_liquidity+shock_liquidity)*((1.1+run.rate_issuance)/price_LUSD_previous)**run.delta
+    supply_trove = supply_wanted - supply
+
+    CR_ratio = np.array([1.1])
+    rational_inattention = np.array([0.1])
+    quantity_ether = supply_trove * CR_ratio / price_ether_current
+    issuance_LUSD_stabilizer = add_troves(run, troves, price_ether_current, CR_ratio, quantity_ether, rational_inattention)
+    price_LUSD_current = 1.1 + run.rate_issuance
+    #missing in the previous version  
+    liquidity_pool = supply_wanted-stability_pool
+    n_open=n_open+1
+    
+
+  #Floor Arbitrageurs
+  if price_LUSD_current < 1 - run.rate_redemption:
+    shock_redemption = run.rng.generator('redemption', index).normal(0,sd_redemption)
+    redemption_ratio = redemption_star * (1+shock_redemption)
+
+    #supply_current = sum(troves['Supply'])
+    supply_target=stability_pool+liquidity_pool_previous*(drift_liquidity+shock_liquidity)*((1-run.rate_redemption)/price_LUSD_previous)**run.delta
+    supply_diff = supply - supply_target
+    if supply_diff < redemption_ratio * liquidity_pool:
+      redemption_pool=supply_diff
+      #liquidity_pool = liquidity_pool - redemption_pool
+      price_LUSD_current = 1 - run.rate_redemption
+    else:
+      redemption_pool=redemption_ratio * liquidity_pool
+      #liquidity_pool = (1-redemption_ratio)*liquidity_pool
+      price_LUSD_current= price_LUSD_previous * (liquidity_pool/(liquidity_pool_previous*(drift_liquidity+shock_liquidity)))**(1/run.delta)
+    
+    #Shutting down the riskiest troves, taking the residual from the next one
+    n_redempt, ether_redempted = redeem_troves(troves, redemption_pool, price_ether_current)
+
+    #Redemption Fee
+    redemption_fee = run.rate_redemption * redemption_pool
+    
+
+  return[price_LUSD_current, liquidity_pool, troves, issuance_LUSD_stabilizer, redemption_fee, n_redempt, redemption_pool, n_open, ether_redempted]
+
+"""# LQTY Market"""
+
+
+
+def LQTY_market(run, index, data):
+  quantity_LQTY = (100000000/3)*(1-0.5**(index/period))
+  if index <= month: 
+    price_LQTY_current = run.price_LQTY[index-1]
+    annualized_earning = (index/month)**0.5*run.rng.generator('LQTY_market', index).normal(200000000,500000)
+  else:
+    revenue_issuance = data.window_sum('issuance_fee', month)
+    revenue_redemption = data.window_sum('redemption_fee', month)
+    annualized_earning = 365*(revenue_issuance+revenue_redemption)/30
+    #discountin factor to factor in the risk in early days
+    discount=index/period
+    price_LQTY_current = discount*PE_ratio*annualized_earning/LQTY_total_supply
+  
+  MC_LQTY_current = price_LQTY_current * quantity_LQTY
+  return[price_LQTY_current, annualized_earning, MC_LQTY_current]
+
+"""# Fee Policies
+
+A policy sets the issuance and redemption fee rates at the start of every
+step. `rates` gets the run, the step, the series recorded so far and the
+current LUSD supply, and returns both rates plus the values of the extra
+series the policy records (`columns`), whose step 0 values come from
+`initial`. The arithmetic is elementwise, so the same policies drive the
+batched engine, where every argument has one entry per path.
+"""
+
+class FixedFees:
+  #the run's rate_issuance and rate_redemption, unchanged
+  columns = []
+
+  def initial(self, run):
+    return {}
+
+  def rates(self, run, index, data, supply):
+    return run.rate_issuance, run.rate_redemption, {}
+
+class BaseRate:
+  #issuance fee = redemption fee = base rate, which decays and grows with the redeemed share of the supply
+  columns = ["base_rate"]
+
+  def initial(self, run):
+    return {"base_rate": base_rate_initial}
+
+  def rates(self, run, index, data, supply):
+    base_rate_current = run.base_rate_decay * data['base_rate'][index-1] + run.base_rate_sensitivity*(data['redemption_pool'][index-1]/supply)
+    return base_rate_current, base_rate_current, {"base_rate": base_rate_current}
+
+"""# Simulation Program"""
+
+def track_windows(data):
+  #running sums behind the stability return and the annualized LQTY earning
+  for column in ['liquidation_gain', 'airdrop_gain']:
+    data.track(column, day)
+    data.track(column, month)
+  for column in ['issuance_fee', 'redemption_fee']:
+    data.track(column, month)
+
+#Defining Initials
+initials = {"Price_LUSD":1.00, "Price_Ether":price_ether_initial, "n_open":initial_open, "n_close":0, "n_liquidate":0, "n_redempt":0, "ether_redempted":0,
+            "n_troves":initial_open, "stability":0, "liquidity":0, "redemption_pool":0, "debt_liquidated":0,
+            "supply_LUSD":0, "return_stability":initial_return, "airdrop_gain":0, "liquidation_gain":0, "issuance_fee":0, "redemption_fee":0,
+            "price_LQTY":price_LQTY_initial, "MC_LQTY":0, "annualized_earning":0, "collateral":0, "TCR":0, "recovery_mode":0}
+
+class Simulation:
+  #everything a run carries from one step to the next, i.e. what a checkpoint saves
+  def __init__(self, run, policy, data, troves):
+    #the fee policy sets the current rates on the simulation's own copy of the run, so the caller's run keeps its configured rates
+    self.run = copy.copy(run)
+    self.policy = policy
+    self.data = data
+    self.troves = troves
+    #next step to simulate
+    self.index = 1
+    self.stopped = False
+
+def default_policy(base_rate_policy=False, policy=None):
+  #the fee policy defaults to FixedFees, or BaseRate with base_rate_policy
+  return policy or (BaseRate() if base_rate_policy else FixedFees())
+
+def series_schema(base_rate_policy=False, policy=None):
+  #dtypes of the recorded series, e.g. for a ResultsSink
+  return {column: np.float64 for column in list(initials) + default_policy(base_rate_policy, policy).columns}
+
+def pool_aggregates(troves, price_ether_current):
+  #total collateral, TCR and Recovery Mode flag of the troves, from the store's running totals
+  TCR = troves.TCR(price_ether_current)
+  return {"collateral": troves.total_collateral, "TCR": float(TCR), "recovery_mode": float(TCR < CCR)}
+
+def start(run, n_sim=n_sim, base_rate_policy=False, policy=None):
+  policy = default_policy(base_rate_policy, policy)
+  columns = list(initials) + policy.columns
+  data = Recorder(columns, n_sim)
+  track_windows(data)
+  data.record(0, {**initials, **policy.initial(run)})
+  troves = TroveStore(triggers=True, nicr=True)
+  result_open = open_troves(run, troves, 0, data['Price_LUSD'][0])
+  troves = result_open[0]
+  issuance_LUSD_open = result_open[2]
+  supply = troves.total_supply
+  data.record(0, {"issuance_fee": issuance_LUSD_open * initials["Price_LUSD"], "supply_LUSD": supply,
+              "liquidity": 0.5*supply, "stability": 0.5*supply, **pool_aggregates(troves, run.price_ether[0])})
+  return Simulation(run, policy, data, troves)
+
+def advance(simulation, checkpoint=None, checkpoint_every=month, until=None, sink=None, profiler=NULL_PROFILER):
+  #runs the steps before `until` (default: all remaining), saving the state to the file `checkpoint` every checkpoint_every steps,
+  #streaming the recorded rows to `sink` and timing every stage with `profiler`
+  run, policy, data, troves = simulation.run, simulation.policy, simulation.data, simulation.troves
+  stage = profiler.stage
+  if sink is not None and simulation.index == 1:
+    sink.write(0, {column: data[column][0] for column in data.columns})
+  stop = data.n_steps if until is None else min(until, data.n_steps)
+  for index in range(simulation.index, 0 if simulation.stopped else stop):
+    #exogenous ether price input
+    price_ether_current = run.price_ether[index]
+    price_LUSD_previous = data['Price_LUSD'][index-1]
+
+    #policy function determines base rate
+    with stage('fee_policy', index):
+      run.rate_issuance, run.rate_redemption, policy_row = policy.rates(run, index, data, troves.total_supply)
+
+    #trove liquidation & return of stability pool
+    with stage('liquidate_troves', index, troves) as span:
+      result_liquidation = liquidate_troves(run, troves, index, data)
+      span.processed(result_liquidation[6])
+    troves = result_liquidation[0]
+    return_stability = result_liquidation[1]
+    debt_liquidated = result_liquidation[2]
+    ether_liquidated = result_liquidation[3]
+    liquidation_gain = result_liquidation[4]
+    airdrop_gain = result_liquidation[5]
+    n_liquidate = result_liquidation[6]
+
+    #close troves
+    with stage('close_troves', index, troves) as span:
+      result_close = close_troves(run, troves, index, price_LUSD_previous)
+      span.processed(result_close[1])
+    troves = result_close[0]
+    n_close = result_close[1]
+
+    #adjust troves
+    with stage('adjust_troves', index, troves) as span:
+      result_adjustment = adjust_troves(run, troves, index)
+      span.processed(result_adjustment[2])
+    troves = result_adjustment[0]
+    issuance_LUSD_adjust = result_adjustment[1]
+
+    #open troves
+    with stage('open_troves', index, troves) as span:
+      result_open = open_troves(run, troves, index, price_LUSD_previous)
+      span.processed(result_open[1])
+    troves = result_open[0]
+    n_open = result_open[1]  
+    issuance_LUSD_open = result_open[2]
+
+    #Stability Pool
+    with stage('stability_update', index):
+      stability_pool = stability_update(run, data['stability'][index-1], return_stability, index)[0]
+
+    #Calculating Price, Liquidity Pool, and Redemption
+    with stage('price_stabilizer', index, troves) as span:
+      result_price = price_stabilizer(run, troves, index, data, stability_pool, n_open)
+      #redeemed troves and the stabilizer's trove
+      span.processed(result_price[5] + result_price[7] - n_open)
+    price_LUSD_current = result_price[0]
+    liquidity_pool = result_price[1]
+    troves = result_price[2]
+    issuance_LUSD_stabilizer = result_price[3]
+    redemption_fee = result_price[4]
+    n_redempt = result_price[5]
+    redemption_pool = result_price[6]
+    n_open=result_price[7]
+    ether_redempted = result_price[8]
+    #a stability pool beyond the supply leaves no liquidity pool; NaN pools (from a negative base of a fractional power) stop the run too
+    if not liquidity_pool >= 0:
+      simulation.stopped = True
+      break
+
+    #LQTY Market
+    with stage('LQTY_market', index):
+      result_LQTY = LQTY_market(run, index, data)
+    price_LQTY_current = result_LQTY[0]
+    annualized_earning = result_LQTY[1]
+    MC_LQTY_current = result_LQTY[2]
+
+    #Summary
+    issuance_fee = price_LUSD_current * (issuance_LUSD_adjust + issuance_LUSD_open + issuance_LUSD_stabilizer)
+    n_troves = len(troves)
+    supply_LUSD = troves.total_supply
+
+    new_row = {"Price_LUSD":float(price_LUSD_current), "Price_Ether":float(price_ether_current), "n_open":float(n_open), "n_close":float(n_close), 
+               "n_liquidate":float(n_liquidate), "n_redempt": float(n_redempt), "ether_redempted":float(ether_redempted), "n_troves":float(n_troves),
+               "stability":float(stability_pool), "liquidity":float(liquidity_pool), "redemption_pool":float(redemption_pool), "debt_liquidated":float(debt_liquidated),
+               "supply_LUSD":float(supply_LUSD), "issuance_fee":float(issuance_fee), "redemption_fee":float(redemption_fee),
+               "airdrop_gain":float(airdrop_gain), "liquidation_gain":float(liquidation_gain), "return_stability":float(return_stability), 
+               "annualized_earning":float(annualized_earning), "MC_LQTY":float(MC_LQTY_current), "price_LQTY":float(price_LQTY_current),
+               **pool_aggregates(troves, price_ether_current)
+               }
+    new_row.update({column: float(value) for column, value in policy_row.items()})
+    with stage('record', index):
+      data.record(index, new_row)
+      if sink is not None:
+        sink.write(index, new_row)
+    simulation.index = index + 1
+    if price_LUSD_current < 0:
+      simulation.stopped = True
+      break
+    if checkpoint is not None and simulation.index % checkpoint_every == 0:
+      with stage('checkpoint', index):
+        save_checkpoint(simulation, checkpoint)
+  return simulation
+
+def result(simulation):
+  data = simulation.data
+  return[data, simulation.troves.to_frame(simulation.run.price_ether[len(data)-1])]
+
+def simulate(run, n_sim=n_sim, base_rate_policy=False, policy=None, checkpoint=None, checkpoint_every=month, sink=None, profiler=NULL_PROFILER):
+  return result(advance(start(run, n_sim, base_rate_policy, policy), checkpoint, checkpoint_every, sink=sink, profiler=profiler))
+
+def resume(checkpoint, checkpoint_every=month, sink=None, profiler=NULL_PROFILER):
+  #continues a run from its checkpoint file, reproducing the uninterrupted run exactly
+  return result(advance(load_checkpoint(checkpoint), checkpoint, checkpoint_every, sink=sink, profiler=profiler))
+
+
+"""# Entry Point"""
+
+default_config = {"seed": seed, "member": 0, "n_sim": n_sim, "base_rate_policy": False, "policy": None, "params": {}, "cache": True, "sampling": "iid", "tilt": None}
+
+def run(config=None):
+  #runs the simulation described by `config` (keys of default_config) and returns its series and final troves as DataFrames
+  config = {**default_config, **(config or {})}
+  unknown = set(config) - set(default_config)
+  if unknown:
+    raise ValueError(f"unknown config keys: {sorted(unknown)}")
+  data, troves = simulate(new_run(config["seed"], config["member"], config["cache"], config["params"], config["sampling"], config["tilt"]), config["n_sim"], config["base_rate_policy"], config["policy"])
+  return [data.to_frame(), troves]
@@ -0,0 +1,240 @@
+"""Monte Carlo ensembles of the macro model.
+
+Every member runs `engine.simulate` on its own ether price, natural rate and
+LQTY price paths and its own random streams, in a pool of worker processes.
+The members' series are written to a memory-mapped file as they arrive and
+reduced to per-step quantile bands a block of steps at a time, so memory use
+does not grow with the number of members.
+
+The ether shocks of the members are drawn as `sampling` prescribes (see
+`scenarios.standard_shocks`). `EnsembleResult.estimate` uses the terminal
+ether price, whose expectation is known, as a control variate and reports the
+variance reduction over plain Monte Carlo with the same number of members.
+
+For rare events, a `scenarios.Tilt` draws the ether shocks from a crash-prone
+proposal instead, and every member carries the log likelihood ratio of its
+path. Estimates and tail statistics weight the members by it, so they refer
+to the nominal model; the quantile bands describe the tilted ensemble.
+"""
+
+import multiprocessing
+import os
+import tempfile
+import warnings
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from . import engine
+from .scenarios import log_likelihood_ratio, sampling_blocks
+
+BAND_COLUMNS = ['Price_LUSD', 'debt_liquidated', 'price_LQTY']
+QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+def max_drawdown(prices, window):
+    """Largest fall of `prices` from its highest value over the preceding `window` steps."""
+    prices = np.asarray(prices, dtype=float)
+    padded = np.concatenate([np.full(window - 1, prices[0]), prices])
+    highs = np.lib.stride_tricks.sliding_window_view(padded, window).max(axis=1)
+    return 1 - (prices / highs).min()
+
+
+def member_metrics(data):
+    price_LUSD = data['Price_LUSD']
+    return {
+        'steps': len(data),
+        'max_peg_deviation': np.abs(price_LUSD - 1).max(),
+        'min_price_LUSD': price_LUSD.min(),
+        'max_price_LUSD': price_LUSD.max(),
+        'total_debt_liquidated': data['debt_liquidated'].sum(),
+        'max_debt_liquidated': data['debt_liquidated'].max(),
+        'min_price_LQTY': data['price_LQTY'].min(),
+        'final_price_LQTY': np.asarray(data['price_LQTY'])[-1],
+        'max_weekly_ether_drop': max_drawdown(data['Price_Ether'], 7 * engine.day),
+        'min_stability_share': np.min(np.asarray(data['stability']) / np.asarray(data['supply_LUSD'])),
+    }
+
+
+def run_member(member, seed, n_sim, columns, base_rate_policy, sampling="iid", tilt=None):
+    run = engine.new_run(seed, member, cache=False, sampling=sampling, tilt=tilt)
+    data, troves = engine.simulate(run, n_sim, base_rate_policy)
+    # members that stop early (e.g. on a negative liquidity pool) are padded with NaN
+    series = np.full((len(columns), n_sim), np.nan, dtype=np.float32)
+    for i, column in enumerate(columns):
+        series[i, :len(data)] = data[column]
+    # the control variate is read off the exogenous path, so it is defined for members that stop early too
+    return member, series, {**member_metrics(data), 'terminal_price_ether': run.price_ether[n_sim - 1],
+                            'log_weight': log_likelihood_ratio('price_ether', engine.period, engine.sd_ether, seed, member, sampling, tilt,
+                                                               steps=n_sim)}
+
+
+def quantile_bands(series, quantiles, block):
+    bands = np.empty((series.shape[1], len(quantiles)))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for start in range(0, series.shape[1], block):
+            bands[start:start + block] = np.nanquantile(series[:, start:start + block], quantiles, axis=0).T
+    return pd.DataFrame(bands, columns=quantiles).rename_axis('step')
+
+
+def terminal_price_ether_mean(n_sim):
+    """Expected ether price at the last step of an `n_sim` step run."""
+    return engine.price_ether_initial * (1 + engine.drift_ether) ** (n_sim - 1)
+
+
+def weighted_quantile(values, weights, q):
+    """Smallest value whose weighted cumulative share reaches `q`."""
+    order = np.argsort(values)
+    shares = np.cumsum(weights[order]) / weights.sum()
+    return values[order][min(np.searchsorted(shares, q), len(values) - 1)]
+
+
+class EnsembleResult:
+    def __init__(self, bands, metrics, n_sim, sampling="iid"):
+        # column -> DataFrame of per-step quantiles
+        self.bands = bands
+        # one row of summary metrics per member
+        self.metrics = metrics
+        self.n_sim = n_sim
+        self.sampling = sampling
+
+    @property
+    def weights(self):
+        """Likelihood ratio of every member's ether path, scaled to a mean of 1; all 1 without a tilt.
+
+        The log weights are shifted by their maximum before exponentiating, so
+        that long tilted paths do not underflow.
+        """
+        if 'log_weight' not in self.metrics:
+            return np.ones(len(self.metrics))
+        log_weights = self.metrics['log_weight'].to_numpy(dtype=float)
+        weights = np.exp(log_weights - log_weights.max())
+        return weights / weights.mean()
+
+    @property
+    def weighted(self):
+        return bool(np.any(self.weights != 1))
+
+    def effective_sample_size(self):
+        """Members of an unweighted ensemble carrying as much information as the weighted one."""
+        weights = self.weights
+        return weights.sum()**2 / (weights**2).sum()
+
+    def estimate(self, values, control=True):
+        """Ensemble mean of `values` (a metric name or one value per member) with its standard error.
+
+        Members are weighted by their likelihood ratio, normalized to a mean of
+        1 (the self-normalized importance sampling estimate, consistent under
+        the nominal model). With `control`, the terminal ether price is used
+        as a control variate. The standard error treats
+        antithetic pairs and quasi-random point sets as single samples.
+        `variance_reduction` is the variance of the plain Monte Carlo mean over
+        that of this estimate, and `effective_runs` the number of i.i.d.
+        members with the same standard error.
+        """
+        values = self.metrics[values] if isinstance(values, str) else values
+        y = np.asarray(values, dtype=float)
+        weights = self.weights
+        plain_mean = np.mean(weights * y)
+        # each member's contribution to the estimate, whose spread gives the standard error
+        residuals = weights * (y - plain_mean)
+        adjusted = plain_mean + residuals
+        x = weights * (self.metrics['terminal_price_ether'].to_numpy() - terminal_price_ether_mean(self.n_sim))
+        if control and x.var() > 0:
+            beta = np.cov(residuals, x)[0, 1] / x.var(ddof=1)
+            adjusted = adjusted - beta * x
+        blocks = pd.Series(adjusted).groupby(sampling_blocks(self.metrics.index, self.sampling)).mean()
+        standard_error = blocks.std() / np.sqrt(len(blocks))
+        n = len(y)
+        # variance of `values` under the nominal model
+        variance = np.mean(weights * (y - plain_mean)**2) * n / (n - 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance_reduction = variance / n / standard_error**2
+        return {'mean': adjusted.mean(), 'standard_error': standard_error, 'plain_mean': plain_mean,
+                'variance_reduction': variance_reduction, 'effective_runs': n * variance_reduction}
+
+    def tail_probability(self, metric, threshold, below=True, control=True):
+        """`estimate` of the probability that `metric` ends up below (or above) `threshold`."""
+        values = self.metrics[metric]
+        return self.estimate(values < threshold if below else values > threshold, control)
+
+    def peg_loss_probability(self, threshold=0.95, control=True):
+        """`estimate` of the probability that Price_LUSD falls below `threshold` during a run."""
+        return self.tail_probability('min_price_LUSD', threshold, control=control)
+
+    def estimates(self, control=True):
+        """`estimate` of every member metric."""
+        return pd.DataFrame({metric: self.estimate(metric, control) for metric in self.metrics if metric != 'log_weight'}).T
+
+    def tail_statistics(self, levels=(0.95, 0.99)):
+        """Distribution of the member metrics across the ensemble, with both tails
+        and the expected shortfall (mean beyond the quantile) at every level.
+        Weighted members count in proportion to their likelihood ratio."""
+        if self.weighted:
+            return self.weighted_tail_statistics(levels)
+        rows = {}
+        for metric, values in self.metrics.items():
+            if metric == 'log_weight':
+                continue
+            row = {'mean': values.mean(), 'std': values.std()}
+            for level in levels:
+                lower, upper = values.quantile(1 - level), values.quantile(level)
+                row[f'q{1 - level:g}'] = lower
+                row[f'q{level:g}'] = upper
+                row[f'es_lower{level:g}'] = values[values <= lower].mean()
+                row[f'es_upper{level:g}'] = values[values >= upper].mean()
+            rows[metric] = row
+        statistics = pd.DataFrame(rows).T
+        statistics.loc['stopped_early', 'mean'] = (self.metrics['steps'] < self.n_sim).mean()
+        return statistics
+
+    def weighted_tail_statistics(self, levels=(0.95, 0.99)):
+        rows = {}
+        for metric, values in self.metrics.items():
+            if metric == 'log_weight':
+                continue
+            values = values.to_numpy(dtype=float)
+            finite = np.isfinite(values)
+            values, weights = values[finite], self.weights[finite]
+            mean = np.average(values, weights=weights)
+            row = {'mean': mean, 'std': np.sqrt(np.average((values - mean)**2, weights=weights))}
+            for level in levels:
+                lower, upper = weighted_quantile(values, weights, 1 - level), weighted_quantile(values, weights, level)
+                row[f'q{1 - level:g}'] = lower
+                row[f'q{level:g}'] = upper
+                row[f'es_lower{level:g}'] = np.average(values[values <= lower], weights=weights[values <= lower])
+                row[f'es_upper{level:g}'] = np.average(values[values >= upper], weights=weights[values >= upper])
+            rows[metric] = row
+        statistics = pd.DataFrame(rows).T
+        statistics.loc['stopped_early', 'mean'] = np.average(self.metrics['steps'] < self.n_sim, weights=self.weights)
+        return statistics
+
+
+def run_ensemble(n_runs, seed=engine.seed, n_sim=engine.n_sim, base_rate_policy=False,
+                 columns=BAND_COLUMNS, quantiles=QUANTILES, processes=None, block=engine.month, directory=None,
+                 sampling="iid", tilt=None):
+    """Run `n_runs` members on `processes` workers (all cores by default).
+
+    Members are independent with the default `sampling`; use an even `n_runs`
+    for antithetic pairs and a multiple of `scenarios.QMC_POINTS` for
+    quasi-random point sets. `tilt` (a `scenarios.Tilt`) importance samples
+    the ether shocks.
+    """
+    columns = list(columns)
+    metrics = []
+    with tempfile.TemporaryDirectory(dir=directory) as tmp_dir:
+        series = np.lib.format.open_memmap(os.path.join(tmp_dir, 'series.npy'), mode='w+',
+                                           dtype=np.float32, shape=(len(columns), n_runs, n_sim))
+        worker = partial(run_member, seed=seed, n_sim=n_sim, columns=columns, base_rate_policy=base_rate_policy,
+                         sampling=sampling, tilt=tilt)
+        with multiprocessing.Pool(processes) as pool:
+            for member, member_series, member_metric in pool.imap_unordered(worker, range(n_runs)):
+                series[:, member] = member_series
+                metrics.append({'member': member, **member_metric})
+        series.flush()
+        bands = {column: quantile_bands(series[i], quantiles, block) for i, column in enumerate(columns)}
+        del series
+    metrics = pd.DataFrame(metrics).set_index('member').sort_index()
+    return EnsembleResult(bands, metrics, n_sim, sampling)
@@ -0,0 +1,102 @@
+"""Divergent continuations of one macro model run.
+
+Many studies ask what happens after hour k under different ether shocks,
+parameters or fee policies. Instead of rerunning hours 0..k for every branch,
+simulate them once and fork the `engine.Simulation`:
+
+    simulation = engine.advance(engine.start(engine.new_run(), n_sim), until=k)
+    results = run_forks(simulation, [{"branch": b, "price_ether": reshocked_price_ether(simulation, b)}
+                                     for b in range(100)])
+
+A fork shares everything with its parent until it is written: the exogenous
+series are never copied, and the recorded series and trove arrays are copied
+by the first step a fork (or the parent) takes. `run_forks` hands the snapshot
+to its worker processes once, by forking them where the platform allows it,
+and only sends each worker the branch arguments.
+"""
+
+import copy
+import multiprocessing
+
+import numpy as np
+
+from . import engine
+
+
+def fork(simulation, branch=None, price_ether=None, policy=None, params=None):
+    """Copy of `simulation` that continues independently from its next step.
+
+    `branch` gives the continuation its own endogenous random streams (the
+    default None keeps the parent's, so an unchanged fork repeats the parent's
+    future exactly). `price_ether` replaces the ether price path; it must
+    agree with the old path on the steps already simulated. `policy` switches
+    the fee policy and resets the fee rates to `params` or the engine
+    defaults; `params` overrides run parameters (see `engine.run_parameters`).
+    """
+    params = params or {}
+    unknown = set(params) - set(engine.run_parameters)
+    if unknown:
+        raise ValueError(f"unknown run parameters: {sorted(unknown)}")
+    run = copy.copy(simulation.run)
+    if branch is not None:
+        run.rng = run.rng.branch(branch)
+    if price_ether is not None:
+        price_ether = np.asarray(price_ether)
+        if price_ether.shape != np.shape(run.price_ether) or not np.array_equal(price_ether[:simulation.index], run.price_ether[:simulation.index]):
+            raise ValueError("price_ether must cover the whole run and keep the steps already simulated")
+        run.price_ether = price_ether
+    data = simulation.data.fork()
+    if policy is not None:
+        for name in ["rate_issuance", "rate_redemption"]:
+            setattr(run, name, getattr(engine, name))
+        for column, value in policy.initial(run).items():
+            if column not in data.columns:
+                data.add_column(column, value)
+    else:
+        policy = simulation.policy
+    for name, value in params.items():
+        setattr(run, name, value)
+    forked = copy.copy(simulation)
+    forked.run, forked.policy, forked.data, forked.troves = run, policy, data, simulation.troves.fork()
+    return forked
+
+
+def reshocked_price_ether(simulation, branch, sd=engine.sd_ether, drift=engine.drift_ether):
+    """The run's ether price path up to the simulation's last step, followed by fresh shocks of `branch`."""
+    run, index = simulation.run, simulation.index
+    price_ether = np.array(run.price_ether)
+    rng = run.rng.branch(branch)
+    shocks = rng.generator('price_ether', index).normal(0, sd, len(price_ether) - index)
+    price_ether[index:] = price_ether[index - 1] * np.cumprod((1 + shocks) * (1 + drift))
+    return price_ether
+
+
+_snapshot = None
+
+
+def _init_worker(simulation):
+    global _snapshot
+    _snapshot = simulation
+
+
+def _run_fork(task):
+    i, arguments, until = task
+    return i, engine.result(engine.advance(fork(_snapshot, **arguments), until=until))
+
+
+def run_forks(simulation, branches, until=None, processes=None):
+    """Continue `simulation` once per dict of `fork` arguments in `branches`, up to step `until`.
+
+    The continuations run on `processes` workers (all cores by default; 1 runs
+    them in this process). Returns one `engine.result` per branch, in order.
+    """
+    if processes == 1:
+        return [engine.result(engine.advance(fork(simulation, **arguments), until=until)) for arguments in branches]
+    tasks = [(i, arguments, until) for i, arguments in enumerate(branches)]
+    # forked workers inherit the snapshot's pages instead of unpickling a copy each
+    start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else None
+    results = [None] * len(tasks)
+    with multiprocessing.get_context(start_method).Pool(processes, _init_worker, (simulation,)) as pool:
+        for i, result in pool.imap_unordered(_run_fork, tasks):
+            results[i] = result
+    return results
@@ -0,0 +1,463 @@
+"""Compiled backend for the macro model.
+
+The stages of a period of `engine.simulate` (liquidate, close, adjust, open,
+stability pool, price stabilizer, LQTY market) run on flat trove arrays in two
+functions compiled with numba, `begin_step` and `finish_step`. Troves live in
+a (5, capacity) array with the same slots as the engine's `TroveStore`:
+removals move the last troves into the freed slots the way `TroveStore.remove`
+does, and the only sort is over the troves of a period with redemptions.
+
+Every stage draws from the engine's stream for its (stage, step), and the
+kernel keeps the store's running debt and collateral totals and the
+recorder's rolling sums with the same additions as the engine (`pairwise_sum`
+adds like `numpy.sum`), so a kernel run repeats the engine's trajectory.
+`simulate_kernel` drives the steps from Python: it moves the streams to each
+step and draws the troves to close with `Generator.choice`, which numba does
+not compile, between the two calls. It runs the `FixedFees` and `BaseRate` policies; `simulate` hands
+any other policy to `engine.simulate`, as it does every run without numba.
+"""
+
+import numpy as np
+import pandas as pd
+
+from . import engine as e
+from .recorder import Recorder
+from .trove_index import CCR, MCR
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def jit(function):
+    return numba.njit(cache=True)(function) if numba is not None else function
+
+
+COLUMNS = list(e.initials) + ['base_rate']
+(PRICE_LUSD, PRICE_ETHER, N_OPEN, N_CLOSE, N_LIQUIDATE, N_REDEMPT, ETHER_REDEMPTED, N_TROVES, STABILITY, LIQUIDITY,
+ REDEMPTION_POOL, DEBT_LIQUIDATED, SUPPLY_LUSD, RETURN_STABILITY, AIRDROP_GAIN, LIQUIDATION_GAIN, ISSUANCE_FEE,
+ REDEMPTION_FEE, PRICE_LQTY, MC_LQTY, ANNUALIZED_EARNING, COLLATERAL, TCR, RECOVERY_MODE, BASE_RATE) = range(len(COLUMNS))
+
+# streams of the engine's stages, in the order of the generator arguments of the step functions
+STAGES = ['liquidate_troves', 'close_troves', 'adjust_troves', 'open_troves', 'stability_update', 'liquidity', 'redemption', 'LQTY_market']
+
+# trove array rows; IDs are stored as floats, exact below 2**53
+ETHER_QUANTITY, SUPPLY, CR_INITIAL, RATIONAL_INATTENTION, ID = range(5)
+
+# status of a step
+RUNNING, STOPPED, STOPPED_AFTER_RECORD = range(3)
+
+# running totals of the troves, as kept by TroveStore
+TOTAL_SUPPLY, TOTAL_COLLATERAL = range(2)
+# rolling sums of the recorded series, as kept by engine.track_windows
+LIQUIDATION_GAIN_DAY, LIQUIDATION_GAIN_MONTH, AIRDROP_GAIN_DAY, AIRDROP_GAIN_MONTH, ISSUANCE_FEE_MONTH, REDEMPTION_FEE_MONTH = range(6)
+
+# model parameters, passed to the kernel as a tuple so that changing them never needs a recompile
+PARAMETERS = ['period', 'month', 'day', 'sd_return', 'initial_return', 'quantity_LQTY_airdrop', 'sd_closetroves', 'n_steady',
+              'initial_open', 'sd_opentroves', 'distribution_parameter1_CR', 'distribution_parameter2_CR', 'distribution_parameter3_CR',
+              'distribution_parameter1_ether_quantity', 'distribution_parameter2_ether_quantity', 'distribution_parameter1_inattention',
+              'distribution_parameter2_inattention', 'sd_stability', 'drift_stability', 'sd_liquidity', 'drift_liquidity', 'sd_redemption',
+              'redemption_star', 'PE_ratio', 'LQTY_total_supply', 'base_rate_initial']
+
+
+@jit
+def pairwise_sum(values):
+    """Sum of `values` added in the order `numpy.sum` adds them: blocks of 128 in eight lanes, halved above that."""
+    n = len(values)
+    if n < 8:
+        total = 0.0
+        for i in range(n):
+            total += values[i]
+        return total
+    if n <= 128:
+        lanes = values[:8].copy()
+        i = 8
+        while i < n - n % 8:
+            for j in range(8):
+                lanes[j] += values[i + j]
+            i += 8
+        total = ((lanes[0] + lanes[1]) + (lanes[2] + lanes[3])) + ((lanes[4] + lanes[5]) + (lanes[6] + lanes[7]))
+        for j in range(i, n):
+            total += values[j]
+        return total
+    half = n // 2
+    half -= half % 8
+    return pairwise_sum(values[:half]) + pairwise_sum(values[half:])
+
+
+@jit
+def mutated(totals, n):
+    # nothing left to sum: drop the accumulated rounding error
+    if n == 0:
+        totals[TOTAL_SUPPLY] = 0.0
+        totals[TOTAL_COLLATERAL] = 0.0
+
+
+@jit
+def roll(values, sums, k, index, window):
+    # RollingSum.append
+    sums[k] += values[index]
+    if index >= window:
+        sums[k] -= values[index - window]
+    if (index + 1) % window == 0:
+        sums[k] = pairwise_sum(values[index + 1 - window:index + 1])
+
+
+@jit
+def roll_all(out, sums, index, day, month):
+    roll(out[LIQUIDATION_GAIN], sums, LIQUIDATION_GAIN_DAY, index, day)
+    roll(out[LIQUIDATION_GAIN], sums, LIQUIDATION_GAIN_MONTH, index, month)
+    roll(out[AIRDROP_GAIN], sums, AIRDROP_GAIN_DAY, index, day)
+    roll(out[AIRDROP_GAIN], sums, AIRDROP_GAIN_MONTH, index, month)
+    roll(out[ISSUANCE_FEE], sums, ISSUANCE_FEE_MONTH, index, month)
+    roll(out[REDEMPTION_FEE], sums, REDEMPTION_FEE_MONTH, index, month)
+
+
+@jit
+def record_aggregates(out, index, totals, price_ether):
+    supply, collateral = totals[TOTAL_SUPPLY], totals[TOTAL_COLLATERAL]
+    ratio = price_ether * collateral / supply if supply > 0 else np.inf
+    out[SUPPLY_LUSD, index] = supply
+    out[COLLATERAL, index] = collateral
+    out[TCR, index] = ratio
+    out[RECOVERY_MODE, index] = 1.0 if ratio < CCR else 0.0
+
+
+@jit
+def append_trove(troves, n, next_id, ether_quantity, supply, CR_initial, rational_inattention):
+    if n == troves.shape[1]:
+        grown = np.empty((5, 2 * n))
+        grown[:, :n] = troves
+        troves = grown
+    troves[ETHER_QUANTITY, n] = ether_quantity
+    troves[SUPPLY, n] = supply
+    troves[CR_INITIAL, n] = CR_initial
+    troves[RATIONAL_INATTENTION, n] = rational_inattention
+    troves[ID, n] = next_id
+    return troves
+
+
+@jit
+def remove_troves(troves, n, slots, totals):
+    """Remove the troves in the distinct `slots` like `TroveStore.remove` and return the new count.
+
+    The troves kept past the new end fill the freed slots before it, in order.
+    """
+    if len(slots) == 0:
+        return n
+    totals[TOTAL_SUPPLY] -= pairwise_sum(troves[SUPPLY][slots])
+    totals[TOTAL_COLLATERAL] -= pairwise_sum(troves[ETHER_QUANTITY][slots])
+    keep = np.ones(n, dtype=np.bool_)
+    for slot in slots:
+        keep[slot] = False
+    length = n - len(slots)
+    mover = length
+    for hole in range(length):
+        if not keep[hole]:
+            while not keep[mover]:
+                mover += 1
+            troves[:, hole] = troves[:, mover]
+            mover += 1
+    mutated(totals, length)
+    return length
+
+
+@jit
+def open_troves(g_open, troves, n, next_id, number, price_ether, rate_issuance, p, totals):
+    CR_ratios = np.empty(number)
+    quantities_ether = np.empty(number)
+    rational_inattentions = np.empty(number)
+    for j in range(number):
+        CR_ratios[j] = p[10] + p[11] * g_open.chisquare(p[12])
+    for j in range(number):
+        quantities_ether[j] = g_open.gamma(p[13], p[14])
+    for j in range(number):
+        rational_inattentions[j] = g_open.gamma(p[15], p[16])
+    return add_troves(troves, n, next_id, price_ether, CR_ratios, quantities_ether, rational_inattentions, rate_issuance, totals)
+
+
+@jit
+def add_troves(troves, n, next_id, price_ether, CR_ratios, quantities_ether, rational_inattentions, rate_issuance, totals):
+    # engine.add_troves: one TroveStore.open of the batch; returns the troves, their count and the issuance fee
+    supply_troves = price_ether * quantities_ether / CR_ratios
+    for j in range(len(supply_troves)):
+        troves = append_trove(troves, n + j, next_id + j, quantities_ether[j], supply_troves[j], CR_ratios[j], rational_inattentions[j])
+    n += len(supply_troves)
+    totals[TOTAL_SUPPLY] += pairwise_sum(supply_troves)
+    totals[TOTAL_COLLATERAL] += pairwise_sum(quantities_ether)
+    mutated(totals, n)
+    return troves, n, rate_issuance * pairwise_sum(supply_troves)
+
+
+@jit
+def first_step(g_open, out, p, price_ether, rate_issuance, totals, sums):
+    """Open the initial troves and fill the pools of step 0; returns the troves and their count."""
+    troves = np.empty((5, 64))
+    roll_all(out, sums, 0, int(p[2]), int(p[1]))
+    g_open.normal(0, p[9])
+    troves, n, issuance_LUSD_open = open_troves(g_open, troves, 0, 0, int(p[8]), price_ether[0], rate_issuance, p, totals)
+    # the second record of step 0 overwrites the issuance fee
+    issuance_fee = issuance_LUSD_open * out[PRICE_LUSD, 0]
+    sums[ISSUANCE_FEE_MONTH] += issuance_fee - out[ISSUANCE_FEE, 0]
+    out[ISSUANCE_FEE, 0] = issuance_fee
+    supply = totals[TOTAL_SUPPLY]
+    out[LIQUIDITY, 0] = 0.5 * supply
+    out[STABILITY, 0] = 0.5 * supply
+    record_aggregates(out, 0, totals, price_ether[0])
+    return troves, n
+
+
+@jit
+def begin_step(index, g_liquidate, g_close, troves, n, totals, sums, out, p, price_ether, rate_issuance, rate_redemption, beta,
+               base_rate_decay, base_rate_sensitivity, base_rate_policy):
+    """Fee policy, liquidations and the number of troves to close at step `index`.
+
+    Returns the trove count, the fee rates and the number of troves to close.
+    """
+    period, month, day = int(p[0]), int(p[1]), int(p[2])
+    price_ether_current = price_ether[index]
+    price_LUSD_previous = out[PRICE_LUSD, index - 1]
+    if base_rate_policy:
+        rate_issuance = base_rate_decay * out[BASE_RATE, index - 1] + base_rate_sensitivity * (out[REDEMPTION_POOL, index - 1] / totals[TOTAL_SUPPLY])
+        rate_redemption = rate_issuance
+    out[BASE_RATE, index] = rate_issuance
+
+    #liquidate troves
+    liquidated = np.empty(n, dtype=np.int64)
+    n_liquidate = 0
+    for i in range(n):
+        if troves[ETHER_QUANTITY, i] / troves[SUPPLY, i] < MCR / price_ether_current:
+            liquidated[n_liquidate] = i
+            n_liquidate += 1
+    liquidated = liquidated[:n_liquidate]
+    debt_liquidated = pairwise_sum(troves[SUPPLY][liquidated])
+    ether_liquidated = pairwise_sum(troves[ETHER_QUANTITY][liquidated])
+    n = remove_troves(troves, n, liquidated, totals)
+    out[N_LIQUIDATE, index] = n_liquidate
+    out[DEBT_LIQUIDATED, index] = debt_liquidated
+    out[LIQUIDATION_GAIN, index] = ether_liquidated * price_ether_current - debt_liquidated * price_LUSD_previous
+    out[AIRDROP_GAIN, index] = out[PRICE_LQTY, index - 1] * p[5]
+
+    shock_return = g_liquidate.normal(0, p[3])
+    stability_pool_previous = out[STABILITY, index - 1]
+    if index <= day:
+        return_stability = p[4] * (1 + shock_return)
+    elif index <= month:
+        return_stability = min(0.5, 365 * (sums[LIQUIDATION_GAIN_DAY] + sums[AIRDROP_GAIN_DAY]) / (price_LUSD_previous * stability_pool_previous))
+    else:
+        return_stability = (365 / 30) * (sums[LIQUIDATION_GAIN_MONTH] + sums[AIRDROP_GAIN_MONTH]) / (price_LUSD_previous * stability_pool_previous)
+    out[RETURN_STABILITY, index] = return_stability
+
+    #number of troves to close
+    shock_closetroves = g_close.normal(0, p[6])
+    if index <= 240:
+        number_closetroves = g_close.uniform(0, 1)
+    else:
+        number_closetroves = max(0.0, p[7] * (1 + shock_closetroves))
+        if price_LUSD_previous < 1:
+            number_closetroves += beta * (1 - price_LUSD_previous) * n
+    return n, rate_issuance, rate_redemption, int(np.rint(number_closetroves))
+
+
+@jit
+def finish_step(index, drops, g_adjust, g_open, g_stability, g_liquidity, g_redemption, g_LQTY, troves, n, next_id, totals, sums, out, p,
+                price_ether, natural_rate, price_LQTY, rate_issuance, rate_redemption, alpha, delta, theta):
+    """Close the troves in `drops` and run the rest of step `index`.
+
+    Returns the troves, their count, the next trove ID and the step's status.
+    """
+    period, month, day = int(p[0]), int(p[1]), int(p[2])
+    price_ether_current = price_ether[index]
+    price_LUSD_previous = out[PRICE_LUSD, index - 1]
+
+    #close troves
+    n_close = len(drops)
+    n = remove_troves(troves, n, drops, totals)
+    if n < n_close:
+        n_close = -999
+
+    #adjust troves, keeping the totals as the two TroveStore.update calls of the engine do
+    ratio = g_adjust.uniform(0, 1)
+    issued = np.empty(n)
+    supply_changes = np.empty(n)
+    collateral_changes = np.empty(n)
+    n_issued = 0
+    n_adjusted = 0
+    for i in range(n):
+        CR_initial = troves[CR_INITIAL, i]
+        check = (price_ether_current * troves[ETHER_QUANTITY, i] / troves[SUPPLY, i] - CR_initial) / (CR_initial * troves[RATIONAL_INATTENTION, i])
+        if check < -1 or check > 2:
+            supply_changes[n_adjusted] = 0.0
+            collateral_changes[n_adjusted] = 0.0
+            if g_adjust.uniform(0, 1) >= ratio:
+                supply_new = price_ether_current * troves[ETHER_QUANTITY, i] / CR_initial
+                if check > 2:
+                    issued[n_issued] = supply_new - troves[SUPPLY, i]
+                    n_issued += 1
+                supply_changes[n_adjusted] = supply_new - troves[SUPPLY, i]
+                troves[SUPPLY, i] = supply_new
+            else:
+                ether_quantity_new = CR_initial * troves[SUPPLY, i] / price_ether_current
+                collateral_changes[n_adjusted] = ether_quantity_new - troves[ETHER_QUANTITY, i]
+                troves[ETHER_QUANTITY, i] = ether_quantity_new
+            n_adjusted += 1
+    issuance_LUSD_adjust = rate_issuance * pairwise_sum(issued[:n_issued])
+    totals[TOTAL_SUPPLY] += pairwise_sum(supply_changes[:n_adjusted])
+    totals[TOTAL_COLLATERAL] += pairwise_sum(collateral_changes[:n_adjusted])
+    mutated(totals, n)
+
+    #open troves
+    shock_opentroves = g_open.normal(0, p[9])
+    number_opentroves = max(0.0, p[7] * (1 + shock_opentroves))
+    if price_LUSD_previous > 1 + rate_issuance:
+        number_opentroves += alpha * (price_LUSD_previous - rate_issuance - 1) * n
+    n_open = int(np.rint(number_opentroves))
+    troves, n, issuance_LUSD_open = open_troves(g_open, troves, n, next_id, n_open, price_ether_current, rate_issuance, p, totals)
+    next_id += n_open
+
+    #stability pool
+    shock_stability = g_stability.normal(0, p[17])
+    drift = p[18] if index <= month else 1.0
+    stability_pool = out[STABILITY, index - 1] * (drift + shock_stability) * (1 + out[RETURN_STABILITY, index] - natural_rate[index]) ** theta
+
+    #price, liquidity pool and arbitrageurs
+    issuance_LUSD_stabilizer = 0.0
+    redemption_fee = 0.0
+    n_redempt = 0
+    ether_redempted = 0.0
+    redemption_pool = 0.0
+    supply = totals[TOTAL_SUPPLY]
+    shock_liquidity = g_liquidity.normal(0, p[19])
+    liquidity_demand = out[LIQUIDITY, index - 1] * (p[20] + shock_liquidity)
+    price_LUSD_current = price_LUSD_previous * ((supply - stability_pool) / liquidity_demand) ** (1 / delta)
+    liquidity_pool = supply - stability_pool
+
+    if price_LUSD_current > 1.1 + rate_issuance:
+        supply_wanted = stability_pool + liquidity_demand * ((1.1 + rate_issuance) / price_LUSD_previous) ** delta
+        CR_ratio = np.full(1, 1.1)
+        quantity_ether = (supply_wanted - supply) * CR_ratio / price_ether_current
+        troves, n, issuance_LUSD_stabilizer = add_troves(troves, n, next_id, price_ether_current, CR_ratio, quantity_ether, np.full(1, 0.1), rate_issuance, totals)
+        next_id += 1
+        price_LUSD_current = 1.1 + rate_issuance
+        liquidity_pool = supply_wanted - stability_pool
+        n_open += 1
+
+    if price_LUSD_current < 1 - rate_redemption:
+        redemption_ratio = p[22] * (1 + g_redemption.normal(0, p[21]))
+        supply_target = stability_pool + liquidity_demand * ((1 - rate_redemption) / price_LUSD_previous) ** delta
+        supply_diff = supply - supply_target
+        if supply_diff < redemption_ratio * liquidity_pool:
+            redemption_pool = supply_diff
+            price_LUSD_current = 1 - rate_redemption
+        else:
+            redemption_pool = redemption_ratio * liquidity_pool
+            price_LUSD_current = price_LUSD_previous * (liquidity_pool / liquidity_demand) ** (1 / delta)
+
+        #close the riskiest troves, taking the residual from the next one
+        order = np.argsort(troves[ETHER_QUANTITY, :n] / troves[SUPPLY, :n], kind='mergesort')
+        redempted = 0.0
+        while n_redempt < n and redempted + troves[SUPPLY, order[n_redempt]] <= redemption_pool:
+            redempted += troves[SUPPLY, order[n_redempt]]
+            n_redempt += 1
+        ether_redempted = redempted / price_ether_current
+        if n_redempt < n:
+            boundary = order[n_redempt]
+            residual = redemption_pool - redempted
+            supply_new = troves[SUPPLY, boundary] - residual
+            totals[TOTAL_SUPPLY] += supply_new - troves[SUPPLY, boundary]
+            troves[SUPPLY, boundary] = supply_new
+            ether_quantity_new = troves[ETHER_QUANTITY, boundary] - residual / price_ether_current
+            totals[TOTAL_COLLATERAL] += ether_quantity_new - troves[ETHER_QUANTITY, boundary]
+            troves[ETHER_QUANTITY, boundary] = ether_quantity_new
+            ether_redempted = redemption_pool / price_ether_current
+        n = remove_troves(troves, n, order[:n_redempt], totals)
+        redemption_fee = rate_redemption * redemption_pool
+
+    #a stability pool beyond the supply, or a NaN one, stops the run
+    if not liquidity_pool >= 0:
+        return troves, n, next_id, STOPPED
+
+    #LQTY market
+    quantity_LQTY = (100000000 / 3) * (1 - 0.5 ** (index / period))
+    if index <= month:
+        price_LQTY_current = price_LQTY[index - 1]
+        annualized_earning = (index / month) ** 0.5 * g_LQTY.normal(200000000, 500000)
+    else:
+        annualized_earning = 365 * (sums[ISSUANCE_FEE_MONTH] + sums[REDEMPTION_FEE_MONTH]) / 30
+        price_LQTY_current = (index / period) * p[23] * annualized_earning / p[24]
+
+    out[PRICE_LUSD, index] = price_LUSD_current
+    out[PRICE_ETHER, index] = price_ether_current
+    out[N_OPEN, index] = n_open
+    out[N_CLOSE, index] = n_close
+    out[N_REDEMPT, index] = n_redempt
+    out[ETHER_REDEMPTED, index] = ether_redempted
+    out[N_TROVES, index] = n
+    out[STABILITY, index] = stability_pool
+    out[LIQUIDITY, index] = liquidity_pool
+    out[REDEMPTION_POOL, index] = redemption_pool
+    record_aggregates(out, index, totals, price_ether_current)
+    out[ISSUANCE_FEE, index] = price_LUSD_current * (issuance_LUSD_adjust + issuance_LUSD_open + issuance_LUSD_stabilizer)
+    out[REDEMPTION_FEE, index] = redemption_fee
+    out[ANNUALIZED_EARNING, index] = annualized_earning
+    out[MC_LQTY, index] = price_LQTY_current * quantity_LQTY
+    out[PRICE_LQTY, index] = price_LQTY_current
+    roll_all(out, sums, index, day, month)
+    if price_LUSD_current < 0:
+        return troves, n, next_id, STOPPED_AFTER_RECORD
+    return troves, n, next_id, RUNNING
+
+
+def simulate_kernel(run, n_sim=e.n_sim, policy=None):
+    """`engine.simulate` on the kernel; runs as plain (slow) Python without numba.
+
+    `policy` defaults to `engine.FixedFees`; only it and `engine.BaseRate` are
+    built into the kernel.
+    """
+    policy = e.default_policy(policy=policy)
+    if type(policy) not in (e.FixedFees, e.BaseRate):
+        raise ValueError(f"the kernel only runs the FixedFees and BaseRate policies, got {type(policy).__name__}")
+    base_rate_policy = isinstance(policy, e.BaseRate)
+    out = np.zeros((len(COLUMNS), n_sim))
+    for column, value in e.initials.items():
+        out[COLUMNS.index(column), 0] = value
+    out[BASE_RATE, 0] = e.base_rate_initial
+    params = tuple(float(getattr(e, name)) for name in PARAMETERS)
+    price_ether, natural_rate = np.asarray(run.price_ether), np.asarray(run.natural_rate)
+    price_LQTY = np.asarray(run.price_LQTY, dtype=float)
+    rng = run.rng
+
+    totals, sums = np.zeros(2), np.zeros(6)
+    troves, n = first_step(rng.at('open_troves', 0), out, params, price_ether, run.rate_issuance, totals, sums)
+    next_id = n
+    length = n_sim
+    for index in range(1, n_sim):
+        g_liquidate, g_close, g_adjust, g_open, g_stability, g_liquidity, g_redemption, g_LQTY = [rng.at(stage, index) for stage in STAGES]
+        n, rate_issuance, rate_redemption, number_closetroves = begin_step(
+            index, g_liquidate, g_close, troves, n, totals, sums, out, params, price_ether, run.rate_issuance, run.rate_redemption, run.beta,
+            run.base_rate_decay, run.base_rate_sensitivity, base_rate_policy)
+        drops = g_close.choice(n, number_closetroves, replace=False)
+        troves, n, next_id, status = finish_step(
+            index, drops, g_adjust, g_open, g_stability, g_liquidity, g_redemption, g_LQTY, troves, n, next_id, totals, sums, out, params,
+            price_ether, natural_rate, price_LQTY, rate_issuance, rate_redemption, run.alpha, run.delta, run.theta)
+        if status != RUNNING:
+            length = index + 1 if status == STOPPED_AFTER_RECORD else index
+            break
+
+    columns = list(e.initials) + policy.columns
+    data = Recorder.from_arrays({column: out[COLUMNS.index(column)] for column in columns}, length)
+    troves = pd.DataFrame({"id": troves[ID, :n].astype(np.int64), "Ether_Quantity": troves[ETHER_QUANTITY, :n], "Supply": troves[SUPPLY, :n],
+                           "CR_initial": troves[CR_INITIAL, :n], "Rational_inattention": troves[RATIONAL_INATTENTION, :n]}).set_index('id')
+    price_ether_final = run.price_ether[length - 1]
+    troves.insert(0, 'Ether_Price', price_ether_final)
+    troves['CR_current'] = price_ether_final * troves['Ether_Quantity'] / troves['Supply']
+    return [data, troves]
+
+
+def simulate(run, n_sim=e.n_sim, policy=None):
+    """Run the model on the compiled kernel, or on the NumPy engine when numba is missing or the policy is not built in."""
+    policy = e.default_policy(policy=policy)
+    if numba is None or type(policy) not in (e.FixedFees, e.BaseRate):
+        return e.simulate(run, n_sim, policy=policy)
+    return simulate_kernel(run, n_sim, policy)
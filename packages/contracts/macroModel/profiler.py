@@ -0,0 +1,143 @@
+"""Per-stage timing and counters of macro model runs.
+
+`engine.advance` wraps every stage of a step in `profiler.stage(...)`. The
+default `NULL_PROFILER` hands out one shared no-op span, so an unprofiled run
+pays a method call per stage and nothing else. A `Profiler` records, for each
+stage and step, the wall time, the number of open troves when the stage
+started, the number of troves the stage processed (reported by the stage
+through `span.processed`) and, with `allocations=True`, the bytes allocated
+while it ran (traced with tracemalloc, which slows the run down noticeably).
+"""
+
+import json
+import time
+import tracemalloc
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def processed(self, count):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullProfiler:
+    """Profiler that records nothing."""
+
+    enabled = False
+
+    def stage(self, name, step, troves=None):
+        return _NULL_SPAN
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class _Span:
+    __slots__ = ('profiler', 'name', 'step', 'troves', 'store_troves', 'count', 'start', 'memory')
+
+    def __init__(self, profiler, name, step, troves):
+        self.profiler = profiler
+        self.name = name
+        self.step = step
+        self.troves = troves
+        self.count = -1
+
+    def processed(self, count):
+        """Report the number of troves the stage looked at or changed."""
+        self.count = int(count)
+
+    def __enter__(self):
+        self.store_troves = -1 if self.troves is None else len(self.troves)
+        if self.profiler.allocations:
+            tracemalloc.reset_peak()
+            self.memory = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        allocated = 0
+        if self.profiler.allocations:
+            allocated = tracemalloc.get_traced_memory()[1] - self.memory
+        self.profiler.records.append((self.name, self.step, self.start, end - self.start,
+                                      self.store_troves, self.count, allocated))
+        return False
+
+
+class Profiler:
+    """Records one (stage, step, start, duration, store troves, processed troves, bytes) tuple per stage call.
+
+    Durations and start times are in nanoseconds. The store size is -1 for
+    stages that do not touch the troves, and the processed count -1 for stages
+    that do not report one; allocated bytes are the peak traced memory above
+    the level at the start of the stage, or 0 without `allocations`.
+    """
+
+    enabled = True
+    fields = ['stage', 'step', 'start_ns', 'duration_ns', 'store_troves', 'troves_processed', 'allocated_bytes']
+
+    def __init__(self, allocations=False):
+        self.allocations = allocations
+        self.records = []
+        if allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stage(self, name, step, troves=None):
+        """Context manager timing stage `name` of `step`; `troves` is the store it works on."""
+        return _Span(self, name, step, troves)
+
+    def stop(self):
+        if self.allocations and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame.from_records(self.records, columns=self.fields)
+
+    def summary(self):
+        """Per-stage totals, sorted by total wall time, with the mean store size and troves processed per call."""
+        records = self.to_frame()
+        store = records['store_troves'].where(records['store_troves'] >= 0)
+        processed = records['troves_processed'].where(records['troves_processed'] >= 0)
+        summary = records.assign(store=store, processed=processed).groupby('stage', sort=False).agg(
+            calls=('step', 'size'), total_s=('duration_ns', 'sum'), mean_us=('duration_ns', 'mean'),
+            max_us=('duration_ns', 'max'), mean_store_troves=('store', 'mean'), mean_troves_processed=('processed', 'mean'),
+            allocated_MB=('allocated_bytes', 'sum'))
+        summary['total_s'] /= 1e9
+        summary['mean_us'] /= 1e3
+        summary['max_us'] /= 1e3
+        summary['allocated_MB'] /= 2**20
+        summary.insert(2, 'share', summary['total_s'] / summary['total_s'].sum())
+        return summary.sort_values('total_s', ascending=False)
+
+    def trace_events(self):
+        """The records as Chrome trace events (chrome://tracing, Perfetto)."""
+        if not self.records:
+            return []
+        origin = min(record[2] for record in self.records)
+        events = []
+        for name, step, start, duration, store_troves, processed, allocated in self.records:
+            args = {'step': step}
+            if store_troves >= 0:
+                args['store_troves'] = store_troves
+            if processed >= 0:
+                args['troves_processed'] = processed
+            if self.allocations:
+                args['allocated_bytes'] = allocated
+            events.append({'name': name, 'cat': 'stage', 'ph': 'X', 'pid': 0, 'tid': 0,
+                           'ts': (start - origin) / 1e3, 'dur': duration / 1e3, 'args': args})
+        return events
+
+    def write_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, f)
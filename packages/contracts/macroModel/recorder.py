@@ -0,0 +1,160 @@
+import copy
+
+import numpy as np
+
+
+class RollingSum:
+    """Running sum of the last `window` recorded values of one column.
+
+    The sum is updated as steps are recorded and re-summed exactly once per
+    window, so queries are O(1) and rounding errors cannot build up. For
+    columns with a path dimension the sum is a vector with one entry per path.
+    """
+
+    def __init__(self, values, window):
+        self.values = values
+        self.window = window
+        self.total = 0.0
+
+    def overwrite(self, index, length, old_value, new_value):
+        if index >= length - self.window:
+            self.total += new_value - old_value
+
+    def append(self, index, value):
+        self.total += value
+        if index >= self.window:
+            self.total -= self.values[index - self.window]
+        if (index + 1) % self.window == 0:
+            block = self.values[index + 1 - self.window:index + 1]
+            # steps of a path dimension are added in order, so a path's sum does not depend on the number of paths
+            self.total = block.sum() if block.ndim == 1 else np.cumsum(block, axis=0)[-1]
+
+
+class Recorder:
+    """Per-step results of a macro model run.
+
+    Every tracked series is a NumPy column preallocated for the whole run, so
+    recording a step is an indexed write instead of a DataFrame append. Reads
+    (`recorder['Price_LUSD'][index-1]`, window slices) only see the steps
+    recorded so far. Columns registered with `track` also keep rolling sums
+    over the last steps, queried with `window_sum`.
+
+    With `width`, every column holds one value per path and step, for engines
+    that advance several scenario paths at once.
+
+    `fork` returns a copy that shares the columns with the original until
+    either of them records a step (copy-on-write).
+    """
+
+    def __init__(self, columns, n_steps, width=None):
+        self.columns = list(columns)
+        self.n_steps = n_steps
+        self.width = width
+        self.length = 0
+        shape = n_steps if width is None else (n_steps, width)
+        self._values = {column: np.zeros(shape) for column in self.columns}
+        self._rolling_sums = {}
+        self._shared = False
+
+    @classmethod
+    def from_arrays(cls, values, length):
+        """Recorder over columns already filled for the first `length` steps."""
+        recorder = cls([], 0)
+        recorder.columns = list(values)
+        recorder.n_steps = length
+        recorder.length = length
+        recorder._values = dict(values)
+        return recorder
+
+    def fork(self):
+        self._shared = True
+        # not copy.copy, which would go through __getstate__ and copy the columns
+        forked = object.__new__(Recorder)
+        forked.__dict__.update(self.__dict__)
+        forked.columns = list(self.columns)
+        forked._values = dict(self._values)
+        forked._rolling_sums = {column: {window: copy.copy(rolling_sum) for window, rolling_sum in rolling_sums.items()}
+                                for column, rolling_sums in self._rolling_sums.items()}
+        return forked
+
+    def add_column(self, column, value):
+        """Add `column`, holding `value` at every step recorded so far."""
+        self._own()
+        self.columns.append(column)
+        self._values[column] = np.zeros((self.n_steps,) + np.shape(self._values[self.columns[0]])[1:])
+        self._values[column][:self.length] = value
+
+    def _own(self):
+        # the first write after a fork copies the shared columns
+        if self._shared:
+            self._values = {column: values.copy() for column, values in self._values.items()}
+            for column, rolling_sums in self._rolling_sums.items():
+                for rolling_sum in rolling_sums.values():
+                    rolling_sum.values = self._values[column]
+            self._shared = False
+
+    def __getstate__(self):
+        # only the recorded steps and the rolling totals, to keep checkpoints small
+        state = self.__dict__.copy()
+        state['_values'] = {column: values[:self.length].copy() for column, values in self._values.items()}
+        state['_rolling_sums'] = {column: {window: rolling_sum.total for window, rolling_sum in rolling_sums.items()}
+                                  for column, rolling_sums in self._rolling_sums.items()}
+        return state
+
+    def __setstate__(self, state):
+        recorded, totals = state.pop('_values'), state.pop('_rolling_sums')
+        self.__dict__.update(state)
+        self._shared = False
+        self._values = {}
+        for column, values in recorded.items():
+            self._values[column] = np.zeros((self.n_steps,) + values.shape[1:])
+            self._values[column][:self.length] = values
+        self._rolling_sums = {}
+        for column, windows in totals.items():
+            for window, total in windows.items():
+                rolling_sum = RollingSum(self._values[column], window)
+                rolling_sum.total = total
+                self._rolling_sums.setdefault(column, {})[window] = rolling_sum
+
+    def __getitem__(self, column):
+        return self._values[column][:self.length]
+
+    def __len__(self):
+        return self.length
+
+    def track(self, column, window):
+        if self.length > 0:
+            raise ValueError("rolling sums must be tracked before the first step is recorded")
+        self._own()
+        self._rolling_sums.setdefault(column, {})[window] = RollingSum(self._values[column], window)
+
+    def window_sum(self, column, window):
+        """Sum of `column` over the last `window` recorded steps."""
+        return self._rolling_sums[column][window].total
+
+    def record(self, index, row):
+        if index >= self.n_steps:
+            raise IndexError(f"step {index} is outside of the {self.n_steps} preallocated steps")
+        if index > self.length:
+            raise IndexError(f"step {index} recorded before step {self.length}")
+        self._own()
+        if index == self.length:
+            self.length += 1
+            for column, value in row.items():
+                self._values[column][index] = value
+            for column, rolling_sums in self._rolling_sums.items():
+                for rolling_sum in rolling_sums.values():
+                    rolling_sum.append(index, self._values[column][index])
+            return
+        for column, rolling_sums in self._rolling_sums.items():
+            if column in row:
+                for rolling_sum in rolling_sums.values():
+                    rolling_sum.overwrite(index, self.length, self._values[column][index], row[column])
+        for column, value in row.items():
+            self._values[column][index] = value
+
+    def to_frame(self, path=None):
+        import pandas as pd
+        if path is None:
+            return pd.DataFrame({column: self[column] for column in self.columns})
+        return pd.DataFrame({column: self[column][:, path] for column in self.columns})
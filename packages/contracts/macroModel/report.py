@@ -0,0 +1,551 @@
+# -*- coding: utf-8 -*-
+"""Figures of the macro model, from the "Exhibition" sections of the notebook.
+
+Every function builds its figures from the DataFrames returned by `engine.run`
+and returns them instead of showing them. plotly and matplotlib are imported
+only when a figure is built, so importing this module is cheap.
+"""
+
+TROVE_MEASURES = ['Ether_Quantity', 'CR_initial', 'Supply', 'Rational_inattention', 'CR_current']
+
+def linevis(data, measure):
+  import plotly.express as px
+  return px.line(data, x=data.index/720, y=measure, title= measure+' dynamics')
+
+"""#**Exhibition**"""
+
+def baseline_figures(data):
+  import plotly.graph_objects as go
+  from plotly.subplots import make_subplots
+  figures = []
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['Price_LUSD'], name="LUSD Price"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['Price_Ether'], name="Ether Price"),
+      secondary_y=True,
+  )
+  fig.update_layout(
+      title_text="Price Dynamics of LUSD and Ether"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="LUSD Price", secondary_y=False)
+  fig.update_yaxes(title_text="Ether Price", secondary_y=True)
+  figures.append(fig)
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_troves'], name="Number of Troves"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['supply_LUSD'], name="LUSD Supply"),
+      secondary_y=True,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Trove Numbers and LUSD Supply"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Number of Troves", secondary_y=False)
+  fig.update_yaxes(title_text="LUSD Supply", secondary_y=True)
+  figures.append(fig)
+
+  fig = make_subplots(rows=2, cols=1)
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_open'], name="Number of Troves Opened", mode='markers'),
+      row=1, col=1, secondary_y=False
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_close'], name="Number of Troves Closed", mode='markers'),
+      row=2, col=1, secondary_y=False
+  )
+  fig.update_layout(
+      title_text="Dynamics of Number of Troves Opened and Closed"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Troves Opened", row=1, col=1)
+  fig.update_yaxes(title_text="Troves Closed", row=2, col=1)
+  figures.append(fig)
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_liquidate'], name="Number of Liquidated Troves", mode='markers'),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_redempt'], name="Number of Redempted Troves", mode='markers'),
+      secondary_y=False,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Number of Liquidated and Redempted Troves"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Number of Liquidated Troves", secondary_y=False)
+  fig.update_yaxes(title_text="Number of Redempted Troves", secondary_y=True)
+  figures.append(fig)
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['liquidity'], name="Liquidity Pool"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['stability'], name="Stability Pool"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=100*data['redemption_pool'], name="100*Redemption Pool"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['return_stability'], name="Return of Stability Pool"),
+      secondary_y=True,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Liquidity, Stability, Redemption Pools and Return of Stability Pool"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Size of Pools", secondary_y=False)
+  fig.update_yaxes(title_text="Return", secondary_y=True)
+  figures.append(fig)
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['airdrop_gain'], name="Airdrop Gain"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['liquidation_gain'], name="Liquidation Gain"),
+      secondary_y=True,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Airdrop and Liquidation Gain"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Airdrop Gain", secondary_y=False)
+  fig.update_yaxes(title_text="Liquidation Gain", secondary_y=True)
+  figures.append(fig)
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['issuance_fee'], name="Issuance Fee"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['redemption_fee'], name="Redemption Fee"),
+      secondary_y=True,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Issuance Fee and Redemption Fee"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Issuance Fee", secondary_y=False)
+  fig.update_yaxes(title_text="Redemption Fee", secondary_y=True)
+  figures.append(fig)
+
+  #linevis(data, 'annualized_earning')
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['price_LQTY'], name="LQTY Price"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['MC_LQTY'], name="LQTY Market Cap"),
+      secondary_y=True,
+  )
+  fig.update_layout(
+      title_text="Dynamics of the Price and Market Cap of LQTY"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="LQTY Price", secondary_y=False)
+  fig.update_yaxes(title_text="LQTY Market Cap", secondary_y=True)
+  figures.append(fig)
+  return figures
+
+def trove_histogram(troves, measure):
+  import plotly.express as px
+  return px.histogram(troves, x=measure, title='Distribution of '+measure, nbins=25)
+
+def trove_figures(troves):
+  return [trove_histogram(troves, measure) for measure in TROVE_MEASURES]
+
+def trove_plots(troves):
+  #matplotlib line plots of the final troves, in store order
+  import matplotlib.pyplot as plt
+  figures = []
+  for measure in ["Ether_Quantity", "CR_initial", "Supply", "CR_current"]:
+    fig, ax = plt.subplots()
+    ax.plot(troves[measure].to_numpy())
+    figures.append(fig)
+  return figures
+
+"""#**Exhibition Part 2**
+
+Baseline (`data`) against the base rate policy (`data2`).
+"""
+
+def comparison_figures(data, data2):
+  import plotly.graph_objects as go
+  from plotly.subplots import make_subplots
+  figures = []
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['Price_LUSD'], name="LUSD Price"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['Price_Ether'], name="Ether Price"),
+      secondary_y=True,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['Price_LUSD'], name="LUSD Price New", line = dict(dash='dot')),
+      secondary_y=False,
+  )
+  fig.update_layout(
+      title_text="Price Dynamics of LUSD and Ether"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="LUSD Price", secondary_y=False)
+  fig.update_yaxes(title_text="Ether Price", secondary_y=True)
+  figures.append(fig)
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_troves'], name="Number of Troves"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['supply_LUSD'], name="LUSD Supply"),
+      secondary_y=True,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['n_troves'], name="Number of Troves New", line = dict(dash='dot')),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['supply_LUSD'], name="LUSD Supply New", line = dict(dash='dot')),
+      secondary_y=True,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Trove Numbers and LUSD Supply"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Number of Troves", secondary_y=False)
+  fig.update_yaxes(title_text="LUSD Supply", secondary_y=True)
+  figures.append(fig)
+
+  fig = make_subplots(rows=2, cols=2)
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_open'], name="Number of Troves Opened", mode='markers'),
+      row=1, col=1, secondary_y=False
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_close'], name="Number of Troves Closed", mode='markers'),
+      row=2, col=1, secondary_y=False
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['n_open'], name="Number of Troves Opened New", mode='markers'),
+      row=1, col=2, secondary_y=False
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['n_close'], name="Number of Troves Closed New", mode='markers'),
+      row=2, col=2, secondary_y=False
+  )
+  fig.update_layout(
+      title_text="Dynamics of Number of Troves Opened and Closed"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Troves Opened", row=1, col=1)
+  fig.update_yaxes(title_text="Troves Closed", row=2, col=1)
+  figures.append(fig)
+
+  fig = make_subplots(rows=2, cols=1)
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_liquidate'], name="Number of Liquidated Troves"),
+      row=1, col=1, secondary_y=False
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['n_redempt'], name="Number of Redempted Troves"),
+      row=2, col=1, secondary_y=False
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['n_liquidate'], name="Number of Liquidated Troves New", line = dict(dash='dot')),
+      row=1, col=1, secondary_y=False
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['n_redempt'], name="Number of Redempted Troves New", line = dict(dash='dot')),
+      row=2, col=1, secondary_y=False
+  )
+  fig.update_layout(
+      title_text="Dynamics of Number of Liquidated and Redempted Troves"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Troves Liquidated", row=1, col=1)
+  fig.update_yaxes(title_text="Troves Redempted", row=2, col=1)
+  figures.append(fig)
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['liquidity'], name="Liquidity Pool"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['stability'], name="Stability Pool"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=100*data['redemption_pool'], name="100*Redemption Pool"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['liquidity'], name="Liquidity Pool New", line = dict(dash='dot')),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['stability'], name="Stability Pool New", line = dict(dash='dot')),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=100*data2['redemption_pool'], name="100*Redemption Pool New", line = dict(dash='dot')),
+      secondary_y=False,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Liquidity, Stability, Redemption Pools and Return of Stability Pool"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Size of Pools", secondary_y=False)
+  figures.append(fig)
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['return_stability'], name="Return of Stability Pool"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['return_stability'], name="Return of Stability Pool New", line = dict(dash='dot')),
+      secondary_y=False,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Liquidity, Stability, Redemption Pools and Return of Stability Pool"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Return", secondary_y=False)
+  figures.append(fig)
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['airdrop_gain'], name="Airdrop Gain"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['liquidation_gain'], name="Liquidation Gain"),
+      secondary_y=True,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['airdrop_gain'], name="Airdrop Gain New", line = dict(dash='dot')),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['liquidation_gain'], name="Liquidation Gain New", line = dict(dash='dot')),
+      secondary_y=True,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Airdrop and Liquidation Gain"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Airdrop Gain", secondary_y=False)
+  fig.update_yaxes(title_text="Liquidation Gain", secondary_y=True)
+  figures.append(fig)
+
+  fig = make_subplots(rows=2, cols=1)
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['issuance_fee'], name="Issuance Fee"),
+      row=1, col=1
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['redemption_fee'], name="Redemption Fee"),
+      row=2, col=1
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['issuance_fee'], name="Issuance Fee New", line = dict(dash='dot')),
+      row=1, col=1
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['redemption_fee'], name="Redemption Fee New", line = dict(dash='dot')),
+      row=2, col=1
+  )
+  fig.update_layout(
+      title_text="Dynamics of Issuance Fee and Redemption Fee"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Issuance Fee", secondary_y=False, row=1, col=1)
+  fig.update_yaxes(title_text="Redemption Fee", secondary_y=False, row=2, col=1)
+  figures.append(fig)
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['annualized_earning'], name="Annualized Earning"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['annualized_earning'], name="Annualized Earning New", line = dict(dash='dot')),
+      secondary_y=False,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Annualized Earning"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Annualized Earning", secondary_y=False)
+  figures.append(fig)
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['price_LQTY'], name="LQTY Price"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=data['MC_LQTY'], name="LQTY Market Cap"),
+      secondary_y=True,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['price_LQTY'], name="LQTY Price New", line = dict(dash='dot')),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['MC_LQTY'], name="LQTY Market Cap New", line = dict(dash='dot')),
+      secondary_y=True,
+  )
+  fig.update_layout(
+      title_text="Dynamics of the Price and Market Cap of LQTY"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="LQTY Price", secondary_y=False)
+  fig.update_yaxes(title_text="LQTY Market Cap", secondary_y=True)
+  figures.append(fig)
+
+  fig = make_subplots(specs=[[{"secondary_y": True}]])
+  fig.add_trace(
+      go.Scatter(x=data.index/720, y=[0.01] * len(data), name="Base Rate"),
+      secondary_y=False,
+  )
+  fig.add_trace(
+      go.Scatter(x=data2.index/720, y=data2['base_rate'], name="Base Rate New"),
+      secondary_y=False,
+  )
+  fig.update_layout(
+      title_text="Dynamics of Issuance Fee and Redemption Fee"
+  )
+  fig.update_xaxes(tick0=0, dtick=1, title_text="Month")
+  fig.update_yaxes(title_text="Issuance Fee", secondary_y=False)
+  fig.update_yaxes(title_text="Redemption Fee", secondary_y=True)
+  figures.append(fig)
+  return figures
+
+def show(data, troves, data2, troves2):
+  #displays every figure, as running the notebook did
+  import matplotlib.pyplot as plt
+  for fig in baseline_figures(data) + trove_figures(troves):
+    fig.show()
+  trove_plots(troves)
+  plt.show()
+  for fig in comparison_figures(data, data2) + trove_figures(troves2):
+    fig.show()
+
+"""# Headless Reports
+
+`write_report` renders every figure without a browser into one static HTML
+page and, optionally, one PNG per figure (which needs kaleido). Line traces
+longer than `max_points` are downsampled with Largest-Triangle-Three-Buckets,
+which keeps the peaks and troughs a plain stride would drop, and the plotly
+figures are rendered in a pool of worker processes.
+"""
+
+def lttb(x, y, threshold):
+  #indices of `threshold` points of (x, y) picked by Largest-Triangle-Three-Buckets, always keeping both ends
+  import numpy as np
+  x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+  n = len(x)
+  if threshold >= n or threshold < 3:
+    return np.arange(n)
+  bounds = np.linspace(1, n - 1, threshold - 1).astype(int)
+  selected = np.empty(threshold, dtype=int)
+  selected[0], selected[-1] = 0, n - 1
+  a = 0
+  for i in range(threshold - 2):
+    lo, hi = bounds[i], bounds[i + 1]
+    next_lo, next_hi = (bounds[i + 1], bounds[i + 2]) if i + 2 < len(bounds) else (n - 1, n)
+    mean_x, mean_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+    area = np.abs((x[a] - mean_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (mean_y - y[a]))
+    a = lo + int(np.argmax(np.nan_to_num(area, nan=-1)))
+    selected[i + 1] = a
+  return selected
+
+def downsample(fig, max_points):
+  #replaces the points of long scatter traces by their LTTB selection, in place
+  import numpy as np
+  for trace in fig.data:
+    if trace.type == 'scatter' and trace.x is not None and len(trace.x) > max_points:
+      keep = lttb(trace.x, trace.y, max_points)
+      trace.update(x=np.asarray(trace.x)[keep], y=np.asarray(trace.y)[keep])
+  return fig
+
+def report_figures(data, troves, data2, troves2):
+  #(section, figure) pairs of the plotly figures, in the order show() displays them
+  return ([("Baseline", fig) for fig in baseline_figures(data)] + [("Baseline troves", fig) for fig in trove_figures(troves)]
+          + [("Baseline vs base rate", fig) for fig in comparison_figures(data, data2)] + [("Base rate troves", fig) for fig in trove_figures(troves2)])
+
+def render_figure(task):
+  #worker: the HTML fragment of one figure, also written as a PNG when png_path is set
+  import plotly.graph_objects as go
+  import plotly.io as pio
+  figure, png_path = task
+  fig = go.Figure(figure)
+  if png_path is not None:
+    fig.write_image(png_path)
+  return pio.to_html(fig, full_html=False, include_plotlyjs=False)
+
+def write_report(directory, data, troves, data2, troves2, png=False, max_points=2000, processes=None):
+  #renders the report headlessly to directory/report.html (and directory/figure_NN.png); returns the HTML path
+  import base64
+  import html
+  import io
+  import multiprocessing
+  import os
+  import matplotlib
+  matplotlib.use("Agg")
+  import matplotlib.pyplot as plt
+  from plotly.offline import get_plotlyjs
+
+  os.makedirs(directory, exist_ok=True)
+  figures = report_figures(data, troves, data2, troves2)
+  tasks = [(downsample(fig, max_points).to_dict(), os.path.join(directory, f"figure_{i:02d}.png") if png else None)
+           for i, (_, fig) in enumerate(figures)]
+  with multiprocessing.Pool(processes) as pool:
+    fragments = pool.map(render_figure, tasks)
+
+  images = []
+  for fig in trove_plots(troves):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    plt.close(fig)
+    images.append(base64.b64encode(buffer.getvalue()).decode())
+
+  body, section = [], None
+  for (figure_section, _), fragment in zip(figures, fragments):
+    if figure_section != section:
+      section = figure_section
+      body.append(f"<h2>{html.escape(section)}</h2>")
+    body.append(fragment)
+  body.append("<h2>Baseline troves, in store order</h2>")
+  body += [f'<img src="data:image/png;base64,{image}">' for image in images]
+
+  path = os.path.join(directory, "report.html")
+  with open(path, "w") as f:
+    f.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>Macro model report</title>"
+            f"<script>{get_plotlyjs()}</script></head>\n<body>\n" + "\n".join(body) + "\n</body></html>\n")
+  return path
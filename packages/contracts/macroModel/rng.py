@@ -0,0 +1,58 @@
+import zlib
+
+import numpy as np
+
+
+class RandomStreams:
+    """Keyed, counter-based random streams for the macro model.
+
+    Every draw site is addressed by (run, stage, step). The run and stage pick a
+    Philox key derived through `SeedSequence`, and the step is written into the
+    high word of the Philox counter, so each step of each stage owns a disjoint
+    block of the same stream. Generators are built directly from their key, so
+    results do not depend on the order in which stages, steps or runs execute.
+
+    `branch` derives streams for a forked continuation of the run, independent
+    of the run's own streams and of every other branch.
+
+    `at` draws what `generator` draws, but moves one generator per stage to the
+    step instead of building a new one, which costs about ten times less.
+    """
+
+    def __init__(self, seed, run=0, branches=()):
+        self.seed = seed
+        self.run = run
+        self.branches = tuple(branches)
+        self._keys = {}
+        self._generators = {}
+
+    def spawn(self, run):
+        return RandomStreams(self.seed, run)
+
+    def branch(self, branch):
+        return RandomStreams(self.seed, self.run, self.branches + (branch,))
+
+    def key(self, stage):
+        key = self._keys.get(stage)
+        if key is None:
+            stage_id = zlib.crc32(stage.encode())
+            seed_sequence = np.random.SeedSequence(self.seed, spawn_key=(self.run, stage_id) + self.branches)
+            key = seed_sequence.generate_state(2, np.uint64)
+            self._keys[stage] = key
+        return key
+
+    def generator(self, stage, step=0):
+        bit_generator = np.random.Philox(counter=[0, 0, 0, step], key=self.key(stage))
+        return np.random.Generator(bit_generator)
+
+    def at(self, stage, step=0):
+        """The stage's shared generator, moved to the start of `step`; it replaces the one of the last call."""
+        entry = self._generators.get(stage)
+        if entry is None:
+            bit_generator = np.random.Philox(key=self.key(stage))
+            entry = self._generators[stage] = (np.random.Generator(bit_generator), bit_generator)
+        generator, bit_generator = entry
+        bit_generator.state = {'bit_generator': 'Philox',
+                               'state': {'counter': np.array([0, 0, 0, step], dtype=np.uint64), 'key': self.key(stage)},
+                               'buffer': np.zeros(4, dtype=np.uint64), 'buffer_pos': 4, 'has_uint32': 0, 'uinteger': 0}
+        return generator
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+from statistics import NormalDist
+
+import numpy as np
+
+from .rng import RandomStreams
+
+CACHE_DIR = os.environ.get("MACRO_MODEL_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+
+SAMPLINGS = ("iid", "antithetic", "halton", "sobol")
+# members per randomized quasi-random point set, and the leading Brownian bridge
+# coordinates of a path that the point set drives
+QMC_POINTS = 64
+QMC_DIMENSIONS = 16
+PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61, 67, 71, 73, 79, 83, 89, 97, 101]
+
+
+def drifts_by_step(length, drift):
+    """Drift applied at steps 1..length-1.
+
+    `drift` is either a constant or a list of `(end, drift)` regimes, where each
+    regime covers the steps below its `end` that no earlier regime covers.
+    """
+    if np.isscalar(drift):
+        return drift
+    ends, values = zip(*drift)
+    if ends[-1] < length:
+        raise ValueError(f"drift regimes end at step {ends[-1]}, before the path length {length}")
+    return np.asarray(values)[np.searchsorted(ends, np.arange(1, length), side="right")]
+
+
+def sampling_blocks(runs, sampling="iid"):
+    """Group of every run in `runs`; runs of different groups are independent.
+
+    Antithetic runs come in pairs (2k, 2k+1) and quasi-random runs in point sets
+    of `QMC_POINTS`, so estimators average within groups before treating them
+    as independent samples.
+    """
+    runs = np.asarray(runs)
+    if sampling == "iid":
+        return runs
+    if sampling == "antithetic":
+        return runs // 2
+    if sampling in ("halton", "sobol"):
+        return runs // QMC_POINTS
+    raise ValueError(f"unknown sampling: {sampling}")
+
+
+def halton(index, dimensions):
+    """Point `index` of the Halton sequence (skipping the origin), one radical inverse per prime base."""
+    point = np.zeros(dimensions)
+    for d, base in enumerate(PRIMES[:dimensions]):
+        i, scale = index + 1, 1.0
+        while i > 0:
+            i, digit = divmod(i, base)
+            scale /= base
+            point[d] += digit * scale
+    return point
+
+
+def sobol(index, dimensions, seed):
+    """Point `index` of a scrambled Sobol sequence (needs SciPy)."""
+    try:
+        from scipy.stats import qmc
+    except ImportError as error:
+        raise ImportError("sobol sampling needs scipy; use halton sampling without it") from error
+    sampler = qmc.Sobol(dimensions, scramble=True, seed=np.random.default_rng(seed))
+    sampler.fast_forward(index)
+    return sampler.random(1)[0]
+
+
+def quasi_normals(stream, dimensions, seed, run, sampling):
+    """Standard normals of run `run` at the leading `dimensions` coordinates of a randomized point set.
+
+    Each point set gets its own random shift (Halton) or scrambling (Sobol),
+    so every run is marginally N(0, 1) and point sets are independent.
+    """
+    point_set, index = divmod(run, QMC_POINTS)
+    randomization = RandomStreams(seed, point_set).generator(f"{stream}/{sampling}")
+    if sampling == "halton":
+        uniforms = (halton(index, dimensions) + randomization.uniform(0, 1, dimensions)) % 1
+    else:
+        uniforms = sobol(index, dimensions, randomization.integers(2**63))
+    uniforms = np.clip(uniforms, 1e-12, 1 - 1e-12)
+    return np.array([NormalDist().inv_cdf(u) for u in uniforms])
+
+
+def brownian_bridge(normals):
+    """Increments of a standard random walk built from `normals` in Brownian bridge order.
+
+    The first normal sets the end point, the next ones the midpoints of ever
+    shorter intervals, so the leading normals carry most of the path's variance.
+    """
+    n = len(normals)
+    walk = np.zeros(n + 1)
+    walk[n] = np.sqrt(n) * normals[0]
+    left, right, used = np.array([0]), np.array([n]), 1
+    while len(left):
+        split = right - left > 1
+        left, right = left[split], right[split]
+        middle = (left + right) // 2
+        mean = walk[left] + (middle - left) / (right - left) * (walk[right] - walk[left])
+        sd = np.sqrt((middle - left) * (right - middle) / (right - left))
+        walk[middle] = mean + sd * normals[used:used + len(middle)]
+        used += len(middle)
+        left, right = np.concatenate([left, middle]), np.concatenate([middle, right])
+    return np.diff(walk)
+
+
+def standard_shocks(stream, n, seed=0, run=0, sampling="iid"):
+    """n standard normal shocks of run `run`, drawn as `sampling` prescribes.
+
+    * iid: independent draws from the run's stream.
+    * antithetic: run 2k+1 takes the negated shocks of run 2k.
+    * halton, sobol: the path is built by a Brownian bridge whose leading
+      `QMC_DIMENSIONS` coordinates come from a randomized quasi-random point
+      set (through the inverse normal CDF) and the rest from the run's stream.
+    """
+    if sampling == "iid":
+        return RandomStreams(seed, run).generator(stream).standard_normal(n)
+    if sampling == "antithetic":
+        sign = -1 if run % 2 else 1
+        return sign * RandomStreams(seed, run - run % 2).generator(stream).standard_normal(n)
+    if sampling in ("halton", "sobol"):
+        normals = RandomStreams(seed, run).generator(stream).standard_normal(n)
+        dimensions = min(QMC_DIMENSIONS, n)
+        normals[:dimensions] = quasi_normals(stream, dimensions, seed, run, sampling)
+        return brownian_bridge(normals)
+    raise ValueError(f"unknown sampling: {sampling}")
+
+
+class Tilt:
+    """Importance sampling proposal for the shocks of a random walk.
+
+    Over steps start..end-1 of the path (all steps by default), shocks are
+    drawn from N(drift, scale * sd) instead of N(0, sd), e.g. a negative drift
+    and a scale above 1 for ether crashes. `log_weight` is the log likelihood
+    ratio of a path under the nominal and the tilted shocks, so weighting
+    paths by its exponential gives unbiased estimates under the nominal model.
+    """
+
+    def __init__(self, drift=0.0, scale=1.0, start=1, end=None):
+        if scale <= 0:
+            raise ValueError(f"tilt scale must be positive, got {scale}")
+        self.drift = drift
+        self.scale = scale
+        self.start = start
+        self.end = end
+
+    def params(self):
+        return {"drift": self.drift, "scale": self.scale, "start": self.start, "end": self.end}
+
+    def window(self, n):
+        # shock i moves the path from step i to step i+1
+        end = n if self.end is None else min(self.end - 1, n)
+        return slice(max(self.start - 1, 0), max(end, 0))
+
+    def shocks(self, normals, sd):
+        shocks = sd * normals
+        window = self.window(len(normals))
+        shocks[window] = self.drift + self.scale * sd * normals[window]
+        return shocks
+
+    def log_weight(self, normals, sd):
+        z = normals[self.window(len(normals))]
+        nominal = (self.drift + self.scale * sd * z) / sd
+        return float(np.sum(np.log(self.scale) + 0.5 * z**2 - 0.5 * nominal**2))
+
+
+def build_random_walk(stream, length, initial, sd, drift=0, seed=0, run=0, sampling="iid", tilt=None):
+    """P_t = P_{t-1} (1 + shock_t) (1 + drift_t), with shock_t ~ N(0, sd) drawn by `standard_shocks`, or by `tilt`."""
+    normals = standard_shocks(stream, length - 1, seed, run, sampling)
+    shocks = sd * normals if tilt is None else tilt.shocks(normals, sd)
+    path = np.empty(length)
+    path[0] = initial
+    np.cumprod((1 + shocks) * (1 + drifts_by_step(length, drift)), out=path[1:])
+    path[1:] *= initial
+    return path
+
+
+def cached(name, params, build, cache_dir=None):
+    """Load the series `name` built from `params`, building and storing it on a miss.
+
+    Series are stored as `.npy` files keyed by a hash of their parameters and
+    returned memory-mapped read-only, so repeated runs and worker processes
+    share the file pages instead of rebuilding or copying the series.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    key = hashlib.sha256(json.dumps([name, params], sort_keys=True).encode()).hexdigest()[:16]
+    path = os.path.join(cache_dir, f"{name}-{key}.npy")
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, build())
+        os.replace(tmp_path, path)
+    return np.load(path, mmap_mode="r")
+
+
+def log_likelihood_ratio(stream, length, sd, seed=0, run=0, sampling="iid", tilt=None, steps=None):
+    """Log weight of the path `build_random_walk` draws with the same arguments (0 without `tilt`).
+
+    With `steps`, only the shocks reaching the first `steps` steps of the path
+    are weighted: a run that uses no more of the path does not depend on the
+    others, and weighting them would only add variance.
+    """
+    if tilt is None:
+        return 0.0
+    normals = standard_shocks(stream, length - 1, seed, run, sampling)
+    return tilt.log_weight(normals if steps is None else normals[:max(steps - 1, 0)], sd)
+
+
+def random_walk(stream, length, initial, sd, drift=0, seed=0, run=0, sampling="iid", tilt=None, cache_dir=None):
+    params = {"length": length, "initial": initial, "sd": sd, "drift": drift, "seed": seed, "run": run}
+    # i.i.d. untilted series keep the cache keys they had before other samplings existed
+    key = dict(params)
+    if sampling != "iid":
+        key["sampling"] = sampling
+    if tilt is not None:
+        key["tilt"] = tilt.params()
+    return cached(stream, key, lambda: build_random_walk(stream, **params, sampling=sampling, tilt=tilt), cache_dir)
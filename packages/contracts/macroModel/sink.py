@@ -0,0 +1,69 @@
+"""Streaming writer for per-step simulation results.
+
+`ResultsSink` buffers a fixed number of steps in NumPy columns and appends
+each full buffer to a Parquet file (or an Arrow IPC file for any other
+extension) as one record batch. Memory use therefore does not grow with the
+length of a run, and readers can load only the columns they need. pyarrow is
+imported only when a sink is opened.
+"""
+
+import numpy as np
+
+
+class ResultsSink:
+    """Write rows of `schema` (column -> NumPy dtype) to `path`, one step per row.
+
+    Only `columns` (default: all of the schema) are written, and only every
+    `every`-th step. Every row also records its step in a leading `step`
+    column.
+    """
+
+    def __init__(self, path, schema, columns=None, every=1, buffer_steps=1024):
+        import pyarrow as pa
+
+        columns = list(schema) if columns is None else list(columns)
+        unknown = set(columns) - set(schema)
+        if unknown:
+            raise ValueError(f"columns not in the schema: {sorted(unknown)}")
+        self.path = path
+        self.every = every
+        self.columns = columns
+        self.schema = pa.schema([('step', pa.int64())] + [(column, pa.from_numpy_dtype(np.dtype(schema[column]))) for column in columns])
+        self._steps = np.empty(buffer_steps, dtype=np.int64)
+        self._buffers = {column: np.empty(buffer_steps, dtype=schema[column]) for column in columns}
+        self._length = 0
+        if path.endswith('.parquet'):
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self._writer = pa.ipc.new_file(path, self.schema)
+
+    def write(self, step, row):
+        """Buffer `row` (a dict with at least the written columns) as step `step`."""
+        if step % self.every:
+            return
+        self._steps[self._length] = step
+        for column, buffer in self._buffers.items():
+            buffer[self._length] = row[column]
+        self._length += 1
+        if self._length == len(self._steps):
+            self.flush()
+
+    def flush(self):
+        if self._length == 0:
+            return
+        import pyarrow as pa
+
+        arrays = [pa.array(self._steps[:self._length])] + [pa.array(self._buffers[column][:self._length]) for column in self.columns]
+        self._writer.write_batch(pa.record_batch(arrays, schema=self.schema))
+        self._length = 0
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
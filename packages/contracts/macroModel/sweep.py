@@ -0,0 +1,60 @@
+"""Policy parameter sweeps of the macro model.
+
+A sweep runs every parameter set (see `engine.run_parameters`) on the same
+ensemble members. Parameter sets are packed into batches of paths for the
+batched engine and the batches run in a pool of worker processes. The
+exogenous series are built once, stored in the scenario cache and
+memory-mapped by every worker.
+"""
+
+import itertools
+import multiprocessing
+from functools import partial
+
+import pandas as pd
+
+from . import engine
+from .batched import BatchRun, path_frame, simulate_batch
+from .ensemble import member_metrics
+
+
+def parameter_grid(**values):
+    """Every combination of the given parameter values, as a list of parameter sets."""
+    return [dict(zip(values, combination)) for combination in itertools.product(*values.values())]
+
+
+def run_batch(tasks, seed, n_sim, base_rate_policy):
+    names = list(tasks[0][1])
+    params = {name: [point[name] for _, point, _ in tasks] for name in names}
+    members = [member for _, _, member in tasks]
+    data, steps = simulate_batch(members, seed, n_sim, base_rate_policy, params, cache=True)
+    return [{'point': point_id, 'member': member, **member_metrics(path_frame(data, steps, path))}
+            for path, (point_id, _, member) in enumerate(tasks)]
+
+
+def run_sweep(points, members=1, seed=engine.seed, n_sim=engine.n_sim, base_rate_policy=False,
+              batch_size=64, processes=None):
+    """Run every parameter set in `points` on ensemble members 0..members-1.
+
+    `points` is a list of parameter sets or a dict of value lists, which is
+    expanded with `parameter_grid`. Returns one row of member metrics per
+    parameter set and member, indexed by the parameter values and the member.
+    Every parameter set sees the same shocks on a member (common random
+    numbers), so results do not depend on `batch_size`.
+    """
+    if isinstance(points, dict):
+        points = parameter_grid(**points)
+    names = sorted(set().union(*points))
+    points = [{name: point.get(name, getattr(engine, name)) for name in names} for point in points]
+    # build the cache entries once, before the workers memory-map them
+    BatchRun(seed, range(members), cache=True)
+
+    tasks = [(point_id, point, member) for point_id, point in enumerate(points) for member in range(members)]
+    batches = [tasks[start:start + batch_size] for start in range(0, len(tasks), batch_size)]
+    worker = partial(run_batch, seed=seed, n_sim=n_sim, base_rate_policy=base_rate_policy)
+    with multiprocessing.Pool(processes) as pool:
+        rows = list(itertools.chain.from_iterable(pool.imap_unordered(worker, batches)))
+
+    results = pd.DataFrame(rows).sort_values(['point', 'member'])
+    parameters = pd.DataFrame(points).rename_axis('point')
+    return results.join(parameters, on='point').drop(columns='point').set_index(names + ['member'])
@@ -0,0 +1,25 @@
+import pandas as pd
+import pytest
+
+from macroModel import engine, scenarios
+from macroModel.batched import path_frame, simulate_batch
+from macroModel.sweep import run_sweep
+
+N_SIM = 1000
+
+
+@pytest.mark.parametrize("base_rate_policy", [False, True])
+def test_paths_do_not_depend_on_the_rest_of_the_batch(base_rate_policy):
+    alone, alone_steps = simulate_batch([2], n_sim=N_SIM, base_rate_policy=base_rate_policy, params={"rate_issuance": 0.02})
+    # the other paths differ in member and parameters, and one of them runs the same member
+    params = {"rate_issuance": [0.01, 0.02, 0.01, 0.005], "alpha": [0.1, engine.alpha, 0.1, 0.1]}
+    mixed, mixed_steps = simulate_batch([0, 2, 1, 2], n_sim=N_SIM, base_rate_policy=base_rate_policy, params=params)
+    pd.testing.assert_frame_equal(path_frame(mixed, mixed_steps, 1), path_frame(alone, alone_steps, 0))
+
+
+def test_sweep_results_do_not_depend_on_the_batch_size(tmp_path, monkeypatch):
+    monkeypatch.setattr(scenarios, "CACHE_DIR", str(tmp_path))
+    points = {"rate_issuance": [0.005, 0.01, 0.02], "rate_redemption": [0.01, 0.03]}
+    results = [run_sweep(points, members=2, n_sim=300, batch_size=batch_size, processes=1) for batch_size in [1, 5]]
+    assert len(results[0]) == 12
+    pd.testing.assert_frame_equal(results[0], results[1])
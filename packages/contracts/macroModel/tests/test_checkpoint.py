@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from macroModel import engine
+from macroModel.checkpoint import save_checkpoint
+
+N_SIM = 2000
+SPLIT = 1234
+
+
+@pytest.mark.parametrize("base_rate_policy", [False, True])
+def test_resume_reproduces_uninterrupted_run(tmp_path, base_rate_policy):
+    expected, expected_troves = engine.simulate(engine.new_run(cache=False), N_SIM, base_rate_policy)
+
+    simulation = engine.advance(engine.start(engine.new_run(cache=False), N_SIM, base_rate_policy), until=SPLIT)
+    assert simulation.index == SPLIT
+    path = tmp_path / "run.ckpt"
+    save_checkpoint(simulation, path)
+    data, troves = engine.resume(path)
+
+    assert data.columns == expected.columns
+    assert len(data) == len(expected)
+    for column in expected.columns:
+        np.testing.assert_array_equal(data[column], expected[column], err_msg=column)
+    assert troves.equals(expected_troves)
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from macroModel import engine
+from macroModel.ensemble import EnsembleResult, run_ensemble
+from macroModel.scenarios import Tilt, log_likelihood_ratio, standard_shocks
+
+N_RUNS = 64
+N_SIM = 200
+
+
+def test_log_weight_covers_the_simulated_shocks_only():
+    tilt = Tilt(drift=-0.005, scale=1.5)
+    normals = standard_shocks('price_ether', engine.period - 1, engine.seed, 3)
+    log_weight = log_likelihood_ratio('price_ether', engine.period, engine.sd_ether, engine.seed, 3, tilt=tilt, steps=N_SIM)
+    assert log_weight == tilt.log_weight(normals[:N_SIM - 1], engine.sd_ether)
+
+
+def test_weights_do_not_underflow():
+    metrics = pd.DataFrame({'log_weight': [-2000.0, -2001.0, -2003.0], 'terminal_price_ether': [1.0, 2.0, 3.0]})
+    result = EnsembleResult({}, metrics, N_SIM, "iid")
+    assert np.all(np.isfinite(result.weights)) and result.weights.mean() == pytest.approx(1)
+    assert 1 < result.effective_sample_size() < 3
+
+
+def test_tilted_estimate_matches_untilted():
+    plain = run_ensemble(N_RUNS, n_sim=N_SIM, processes=1)
+    tilted = run_ensemble(N_RUNS, n_sim=N_SIM, processes=1, tilt=Tilt(drift=-0.001))
+    assert tilted.weighted and tilted.effective_sample_size() > N_RUNS / 4
+    expected, estimate = plain.estimate('max_weekly_ether_drop', control=False), tilted.estimate('max_weekly_ether_drop', control=False)
+    assert abs(estimate['mean'] - expected['mean']) < 4 * np.hypot(estimate['standard_error'], expected['standard_error'])
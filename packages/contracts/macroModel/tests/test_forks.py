@@ -0,0 +1,58 @@
+import copy
+
+import numpy as np
+import pytest
+
+from macroModel import engine
+from macroModel.forks import fork, reshocked_price_ether
+
+N_SIM = 2000
+SPLIT = 1234
+
+
+def assert_same_run(data, troves, expected, expected_troves):
+    assert data.columns == expected.columns
+    assert len(data) == len(expected)
+    for column in expected.columns:
+        np.testing.assert_array_equal(data[column], expected[column], err_msg=column)
+    assert troves.equals(expected_troves)
+
+
+def split_run(base_rate_policy=False):
+    return engine.advance(engine.start(engine.new_run(cache=False), N_SIM, base_rate_policy), until=SPLIT)
+
+
+@pytest.mark.parametrize("base_rate_policy", [False, True])
+def test_unmodified_fork_and_parent_reproduce_uninterrupted_run(base_rate_policy):
+    expected, expected_troves = engine.simulate(engine.new_run(cache=False), N_SIM, base_rate_policy)
+
+    parent = split_run(base_rate_policy)
+    forked = fork(parent)
+    for simulation in [forked, parent]:
+        engine.advance(simulation)
+        assert_same_run(simulation.data, simulation.troves.to_frame(simulation.run.price_ether[N_SIM - 1]),
+                        expected, expected_troves)
+
+
+def test_writes_to_one_branch_leave_the_other_unchanged():
+    parent = split_run()
+    data, troves = copy.deepcopy(parent.data), parent.troves.to_frame(parent.run.price_ether[SPLIT - 1])
+    forked = fork(parent, branch=1, price_ether=reshocked_price_ether(parent, 1))
+
+    # the arrays are shared until written, and writes through the views are refused
+    assert np.shares_memory(forked.troves['Supply'], parent.troves['Supply'])
+    assert np.shares_memory(forked.data['Price_LUSD'], parent.data['Price_LUSD'])
+    with pytest.raises(ValueError):
+        forked.troves['Supply'][0] = 1.0
+    forked.troves.update('Supply', 2 * forked.troves['Supply'][:3], [0, 1, 2])
+    forked.troves.remove([3])
+    engine.advance(forked, until=SPLIT + 200)
+    assert len(forked.data) == SPLIT + 200
+    assert_same_run(parent.data, parent.troves.to_frame(parent.run.price_ether[SPLIT - 1]), data, troves)
+
+    # and the other way round
+    forked_data = copy.deepcopy(forked.data)
+    forked_troves = forked.troves.to_frame(forked.run.price_ether[SPLIT + 199])
+    parent.troves.update('Ether_Quantity', 1.1 * parent.troves['Ether_Quantity'])
+    engine.advance(parent)
+    assert_same_run(forked.data, forked.troves.to_frame(forked.run.price_ether[SPLIT + 199]), forked_data, forked_troves)
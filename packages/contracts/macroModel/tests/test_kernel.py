@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from macroModel import engine, kernel
+
+N_SIM = 1000
+
+
+@pytest.mark.parametrize("policy", [engine.FixedFees(), engine.BaseRate()], ids=["FixedFees", "BaseRate"])
+@pytest.mark.parametrize("member", [0, 3])
+def test_kernel_follows_engine_trajectory(policy, member):
+    # without numba, simulate_kernel runs the kernel as plain Python
+    data, troves = kernel.simulate_kernel(engine.new_run(member=member, cache=False), N_SIM, policy)
+    expected, expected_troves = engine.simulate(engine.new_run(member=member, cache=False), N_SIM, policy=policy)
+
+    assert data.columns == expected.columns
+    assert len(data) == len(expected)
+    for column in expected.columns:
+        np.testing.assert_array_equal(data[column], expected[column], err_msg=column)
+    assert troves.equals(expected_troves)
+
+
+class HalfFees(engine.FixedFees):
+    def rates(self, run, index, data, supply):
+        return run.rate_issuance / 2, run.rate_redemption / 2, {}
+
+
+def test_other_policies_run_on_the_engine():
+    with pytest.raises(ValueError):
+        kernel.simulate_kernel(engine.new_run(cache=False), 10, HalfFees())
+    data, _ = kernel.simulate(engine.new_run(cache=False), 300, HalfFees())
+    expected, _ = engine.simulate(engine.new_run(cache=False), 300, policy=HalfFees())
+    np.testing.assert_array_equal(data['Price_LUSD'], expected['Price_LUSD'])
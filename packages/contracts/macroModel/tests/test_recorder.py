@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from macroModel import engine
+from macroModel.recorder import Recorder
+
+N_STEPS = 200
+WINDOWS = [1, 7, 24]
+
+
+def assert_window_sums(recorder, column, windows):
+    values = recorder[column]
+    for window in windows:
+        expected = values[-window:].sum()
+        if len(values) % window == 0:
+            # the sum was just re-summed from the block itself
+            assert recorder.window_sum(column, window) == expected
+        else:
+            assert recorder.window_sum(column, window) == pytest.approx(expected, rel=1e-12, abs=1e-9)
+
+
+def test_running_sums_match_slice_sums():
+    values = np.random.default_rng(0).lognormal(5, 2, N_STEPS) * np.random.default_rng(1).choice([0, 1], N_STEPS)
+    recorder = Recorder(['x', 'y'], N_STEPS)
+    for window in WINDOWS:
+        recorder.track('x', window)
+    # as engine.start does, step 0 is recorded and then completed
+    recorder.record(0, {'x': 0.0, 'y': 1.0})
+    recorder.record(0, {'x': values[0]})
+    assert_window_sums(recorder, 'x', WINDOWS)
+    for index in range(1, N_STEPS):
+        recorder.record(index, {'x': values[index], 'y': 1.0})
+        assert_window_sums(recorder, 'x', WINDOWS)
+        if index % 10 == 5:
+            # overwrite the current step, a step inside the longest window and one that has left every window
+            for step in [index, index - 3, index - max(WINDOWS)]:
+                if step >= 0:
+                    recorder.record(step, {'x': recorder['x'][step] + 1.5})
+            assert_window_sums(recorder, 'x', WINDOWS)
+
+
+def test_engine_window_sums_match_slice_sums():
+    simulation = engine.start(engine.new_run(cache=False), 2000)
+    # the issuance fee of the initial troves only lands in step 0 by overwriting it
+    assert simulation.data.window_sum('issuance_fee', engine.month) == simulation.data['issuance_fee'][0] > 0
+    for until in [engine.day + 5, engine.month, 1999, 2000]:
+        engine.advance(simulation, until=until)
+        for column in ['liquidation_gain', 'airdrop_gain']:
+            assert_window_sums(simulation.data, column, [engine.day, engine.month])
+        for column in ['issuance_fee', 'redemption_fee']:
+            assert_window_sums(simulation.data, column, [engine.month])
@@ -0,0 +1,72 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from macroModel import engine
+from macroModel.ensemble import EnsembleResult, terminal_price_ether_mean
+from macroModel.scenarios import (QMC_DIMENSIONS, QMC_POINTS, brownian_bridge, build_random_walk, quasi_normals,
+                                  sampling_blocks, standard_shocks)
+
+N_SIM = 500
+
+
+@pytest.mark.parametrize("k", [0, 1, 7])
+def test_antithetic_runs_negate_their_pair(k):
+    shocks = standard_shocks('price_ether', 1000, engine.seed, 2 * k, "antithetic")
+    np.testing.assert_array_equal(standard_shocks('price_ether', 1000, engine.seed, 2 * k + 1, "antithetic"), -shocks)
+    np.testing.assert_array_equal(shocks, standard_shocks('price_ether', 1000, engine.seed, 2 * k))
+
+
+def largest_cdf_gap(normals):
+    """Kolmogorov-Smirnov distance of each column's N(0, 1) probabilities from the uniform distribution."""
+    uniforms = np.sort(np.vectorize(NormalDist().cdf)(normals), axis=0)
+    levels = np.arange(1, len(uniforms) + 1)[:, None] / len(uniforms)
+    return np.maximum(levels - uniforms, uniforms - levels + 1 / len(uniforms)).max(axis=0)
+
+
+@pytest.mark.parametrize("sampling", ["halton", "sobol"])
+def test_quasi_random_marginals_are_standard_normal(sampling):
+    if sampling == "sobol":
+        pytest.importorskip("scipy")
+    # across point sets, every coordinate of a run is N(0, 1)
+    normals = np.array([quasi_normals('price_ether', QMC_DIMENSIONS, engine.seed, 5 + QMC_POINTS * point_set, sampling)
+                        for point_set in range(1000)])
+    assert largest_cdf_gap(normals).max() < 0.06
+    # within a point set, the leading coordinates are spread more evenly than independent draws would be
+    normals = np.array([quasi_normals('price_ether', QMC_DIMENSIONS, engine.seed, run, sampling) for run in range(QMC_POINTS)])
+    assert largest_cdf_gap(normals[:, :2]).max() < 0.05
+
+
+@pytest.mark.parametrize("n", [1, 13, 16, 100])
+def test_brownian_bridge_increments_are_independent_standard_normals(n):
+    # the increments are a linear map of the normals; they are i.i.d. N(0, 1) iff the map is orthogonal
+    bridge = np.column_stack([brownian_bridge(column) for column in np.eye(n)])
+    np.testing.assert_allclose(bridge @ bridge.T, np.eye(n), atol=1e-12)
+    normals = np.random.default_rng(0).standard_normal(n)
+    assert brownian_bridge(normals).sum() == pytest.approx(np.sqrt(n) * normals[0])
+
+
+def test_sampling_blocks():
+    runs = np.arange(3 * QMC_POINTS)
+    np.testing.assert_array_equal(sampling_blocks(runs), runs)
+    np.testing.assert_array_equal(sampling_blocks(runs, "antithetic"), np.repeat(np.arange(len(runs) // 2), 2))
+    for sampling in ["halton", "sobol"]:
+        np.testing.assert_array_equal(sampling_blocks(runs, sampling), np.repeat(np.arange(3), QMC_POINTS))
+    with pytest.raises(ValueError):
+        sampling_blocks(runs, "latin")
+
+
+def test_antithetic_control_variate_estimates():
+    paths = np.array([build_random_walk('price_ether', N_SIM, engine.price_ether_initial, engine.sd_ether, engine.drift_ether,
+                                        engine.seed, run, "antithetic") for run in range(128)])
+    metrics = pd.DataFrame({'terminal_price_ether': paths[:, -1], 'max_price_ether': paths.max(axis=1)})
+    result = EnsembleResult({}, metrics, N_SIM, "antithetic")
+
+    # antithetic pairs alone beat plain Monte Carlo on the terminal price
+    assert result.estimate('terminal_price_ether', control=False)['variance_reduction'] > 1
+    # and the control variate recovers its known mean
+    assert result.estimate('terminal_price_ether')['mean'] == pytest.approx(terminal_price_ether_mean(N_SIM))
+    plain, controlled = result.estimate('max_price_ether', control=False), result.estimate('max_price_ether')
+    assert controlled['variance_reduction'] > plain['variance_reduction'] > 1
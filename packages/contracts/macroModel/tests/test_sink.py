@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from macroModel import engine
+from macroModel.sink import ResultsSink
+
+N_SIM = 1000
+EVERY = 7
+COLUMNS = ["Price_Ether", "n_troves", "supply_LUSD", "base_rate"]
+
+
+def read(path):
+    if path.endswith('.parquet'):
+        return pq.read_table(path).to_pandas()
+    return pa.ipc.open_file(path).read_all().to_pandas()
+
+
+@pytest.mark.parametrize("extension", ["parquet", "arrow"])
+def test_streamed_rows_match_the_recorded_series(tmp_path, extension):
+    path = str(tmp_path / f"run.{extension}")
+    # a buffer shorter than the run, so several record batches are written
+    with ResultsSink(path, engine.series_schema(True), COLUMNS, EVERY, buffer_steps=16) as sink:
+        engine.simulate(engine.new_run(cache=False), N_SIM, True, sink=sink)
+    expected, _ = engine.run({"n_sim": N_SIM, "base_rate_policy": True, "cache": False})
+
+    written = read(path)
+    assert list(written.columns) == ["step"] + COLUMNS
+    np.testing.assert_array_equal(written["step"], np.arange(0, N_SIM, EVERY))
+    pd.testing.assert_frame_equal(written[COLUMNS], expected.loc[written["step"], COLUMNS].reset_index(drop=True))
+
+
+def test_unknown_columns_are_refused(tmp_path):
+    with pytest.raises(ValueError):
+        ResultsSink(str(tmp_path / "run.parquet"), engine.series_schema(), ["base_rate"])
@@ -0,0 +1,129 @@
+import numpy as np
+import pytest
+
+from macroModel import engine
+from macroModel.trove_index import (MCR, TriggerIndex, nominal_CR, redeem_troves, riskiest, trigger_prices,
+                                   undercollateralized)
+from macroModel.trove_store import TroveStore
+
+
+def open_troves(troves, rng, number, price_ether):
+    CR_initial = rng.uniform(1.2, 3, number)
+    ether_quantity = rng.gamma(10, 50, number)
+    troves.open(ether_quantity, price_ether * ether_quantity / CR_initial, CR_initial, rng.uniform(0.05, 0.3, number))
+
+
+def out_of_band(troves, price_ether):
+    """Slots of the troves out of their inattention band, by the check of engine.adjust_troves."""
+    CR_initial = troves['CR_initial']
+    check = (price_ether * troves['Ether_Quantity'] / troves['Supply'] - CR_initial) / (CR_initial * troves['Rational_inattention'])
+    return np.flatnonzero((check < -1) | (check > 2))
+
+
+@pytest.mark.parametrize("n_troves", [TriggerIndex.min_troves // 4, 4 * TriggerIndex.min_troves])
+def test_crossed_matches_brute_force_band_check(n_troves):
+    rng = np.random.default_rng(3)
+    price_ether = 2000.0
+    troves = TroveStore(debug=False, triggers=True)
+    open_troves(troves, rng, n_troves, price_ether)
+    for _ in range(200):
+        price_ether *= np.exp(rng.normal(0, 0.02))
+        slots = troves.crossed(price_ether)
+        expected = out_of_band(troves, price_ether)
+        assert np.all(np.diff(slots) > 0)
+        if n_troves < TriggerIndex.min_troves:
+            np.testing.assert_array_equal(slots, np.arange(len(troves)))
+        else:
+            np.testing.assert_array_equal(np.intersect1d(slots, expected), expected)
+            # the index may only add the troves within its rounding margin of a trigger
+            low, high = trigger_prices(troves, np.setdiff1d(slots, expected))
+            margin = TriggerIndex.margin
+            assert np.all((low > price_ether * (1 - margin)) | (high < price_ether * (1 + margin)))
+
+        # adjust half of the troves out of band, then open and close a few
+        adjusted = expected[rng.random(len(expected)) < 0.5]
+        troves.update('Supply', price_ether * troves['Ether_Quantity'][adjusted] / troves['CR_initial'][adjusted], adjusted)
+        open_troves(troves, rng, rng.integers(0, n_troves // 100), price_ether)
+        troves.remove(rng.random(len(troves)) < 0.01)
+
+
+def test_stores_without_indexes_scan():
+    rng = np.random.default_rng(4)
+    price_ether = 2000.0
+    troves = TroveStore(debug=False)
+    open_troves(troves, rng, 100, price_ether)
+    np.testing.assert_array_equal(troves.crossed(1.5 * price_ether), np.arange(len(troves)))
+    ratios = nominal_CR(troves)
+    np.testing.assert_array_equal(undercollateralized(troves, 0.7 * price_ether), np.flatnonzero(ratios < MCR / (0.7 * price_ether)))
+    np.testing.assert_array_equal(riskiest(troves, troves.total_supply), np.argsort(ratios, kind='stable'))
+
+    # the engine's stages run on such a store too
+    run = engine.new_run(cache=False)
+    assert engine.adjust_troves(run, troves, 1)[2] == len(troves)
+
+
+def test_nicr_index_matches_scan():
+    rng = np.random.default_rng(5)
+    price_ether = 2000.0
+    troves = TroveStore(debug=False, nicr=True)
+    open_troves(troves, rng, 5000, price_ether)
+    for _ in range(100):
+        price_ether *= np.exp(rng.normal(0, 0.03))
+        ratios = nominal_CR(troves)
+        np.testing.assert_array_equal(troves.nicr.below(troves, MCR / price_ether), np.flatnonzero(ratios < MCR / price_ether))
+        debt = rng.uniform(0, 0.02) * troves.total_supply
+        order = troves.nicr.riskiest(troves, debt)
+        scan = np.argsort(ratios, kind='stable')
+        covered = np.searchsorted(np.cumsum(troves['Supply'][scan]), debt, side='right') + 1
+        np.testing.assert_array_equal(ratios[order[:covered]], ratios[scan[:covered]])
+
+        changed = rng.random(len(troves)) < 0.05
+        troves.update('Ether_Quantity', troves['Ether_Quantity'][changed] * rng.uniform(0.8, 1.2, changed.sum()), changed)
+        open_troves(troves, rng, rng.integers(0, 50), price_ether)
+        troves.remove(rng.random(len(troves)) < 0.01)
+
+
+def redeem_one_by_one(troves, redemption_pool, price_ether):
+    """Redeem against the troves of the frame `troves` in nominal CR order, one trove at a time."""
+    troves = troves.copy()
+    n_redempt, covered = 0, 0.0
+    for trove_id, trove in troves.iloc[np.argsort(troves['Ether_Quantity'] / troves['Supply'], kind='stable')].iterrows():
+        if covered + trove['Supply'] > redemption_pool:
+            residual = redemption_pool - covered
+            troves.loc[trove_id, 'Supply'] -= residual
+            troves.loc[trove_id, 'Ether_Quantity'] -= residual / price_ether
+            return troves, n_redempt, redemption_pool / price_ether
+        covered += trove['Supply']
+        troves = troves.drop(trove_id)
+        n_redempt += 1
+    return troves, n_redempt, covered / price_ether
+
+
+@pytest.mark.parametrize("nicr", [False, True])
+@pytest.mark.parametrize("share", [0, 0.003, 0.2, "boundary", 1, 1.5])
+def test_redemptions_match_one_by_one(nicr, share):
+    rng = np.random.default_rng(6)
+    price_ether = 2000.0
+    troves = TroveStore(debug=False, nicr=nicr)
+    open_troves(troves, rng, 500, price_ether)
+    troves.remove(rng.random(len(troves)) < 0.1)
+    if share == "boundary":
+        # the pool exactly covers the riskiest troves, which leaves a zero residual
+        redemption_pool = np.cumsum(troves['Supply'][np.argsort(nominal_CR(troves), kind='stable')])[9]
+    else:
+        redemption_pool = share * troves.total_supply
+    before = troves.to_frame(price_ether)
+    expected, expected_n, expected_ether = redeem_one_by_one(before, redemption_pool, price_ether)
+
+    n_redempt, ether_redempted = redeem_troves(troves, redemption_pool, price_ether)
+    assert n_redempt == expected_n
+    assert ether_redempted == expected_ether
+    if share == "boundary":
+        assert n_redempt == 10
+    if share in (1, 1.5):
+        assert len(troves) == 0 and n_redempt == len(before)
+    after = troves.to_frame(price_ether).sort_index()
+    np.testing.assert_array_equal(after.index, expected.sort_index().index)
+    for column in ['Supply', 'Ether_Quantity', 'CR_initial', 'Rational_inattention']:
+        np.testing.assert_array_equal(after[column], expected.sort_index()[column], err_msg=column)
+    assert troves.total_supply == pytest.approx(after['Supply'].sum(), rel=1e-12, abs=1e-6)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from macroModel.trove_store import TOTALS, TroveStore
+
+
+def assert_totals(troves):
+    for field, total in TOTALS.items():
+        assert getattr(troves, total) == pytest.approx(troves[field].sum(), rel=1e-12, abs=1e-9), total
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_running_totals_match_column_sums(indexed):
+    rng = np.random.default_rng(7)
+    troves = TroveStore(capacity=4, debug=False, triggers=indexed, nicr=indexed)
+    for step in range(300):
+        action = step % 5
+        if action == 0 or len(troves) < 10:
+            number = rng.integers(1, 50)
+            troves.open(rng.gamma(10, 500, number), rng.gamma(10, 1e5, number), rng.uniform(1.1, 3, number), rng.uniform(0.05, 0.3, number))
+        elif action == 1:
+            slots = rng.choice(len(troves), rng.integers(1, len(troves)), replace=False)
+            troves.update('Supply', rng.gamma(10, 1e5, len(slots)), slots)
+        elif action == 2:
+            mask = rng.random(len(troves)) < 0.3
+            troves.update('Ether_Quantity', troves['Ether_Quantity'][mask] * 1.1, mask)
+        elif action == 3:
+            troves.remove(rng.random(len(troves)) < 0.2)
+        else:
+            troves.close(rng.choice(troves.ids(), rng.integers(1, 5), replace=False))
+        assert_totals(troves)
+
+    troves.update('Supply', troves['Supply'] * 0.9)
+    assert_totals(troves)
+    troves.remove(np.arange(len(troves)))
+    assert (troves.total_supply, troves.total_collateral) == (0.0, 0.0)
+
+
+def test_debug_catches_writes_that_bypass_the_totals():
+    troves = TroveStore(debug=True)
+    troves.open([1.0, 2.0], [100.0, 200.0], 1.5, 0.1)
+    troves['Supply'][0] = 1000.0
+    with pytest.raises(AssertionError):
+        troves.update('Ether_Quantity', 3.0, [1])
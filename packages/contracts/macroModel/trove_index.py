@@ -0,0 +1,253 @@
+import copy
+
+import numpy as np
+
+# Liquidations and redemptions pick troves by their nominal collateral ratio
+# (collateral / debt): every trove is valued at the same ether price, so it
+# orders troves the same way as their collateral ratio.
+
+MCR = 1.1
+# the system is in Recovery Mode while its total collateral ratio is below the CCR
+CCR = 1.5
+
+
+def nominal_CR(troves, slots=slice(None)):
+    return troves['Ether_Quantity'][slots] / troves['Supply'][slots]
+
+
+def undercollateralized(troves, price_ether):
+    """Ascending slots of the troves whose collateral ratio is below the MCR."""
+    if troves.nicr is None:
+        return np.flatnonzero(nominal_CR(troves) < MCR / price_ether)
+    return troves.nicr.below(troves, MCR / price_ether)
+
+
+def riskiest(troves, debt):
+    """Slots of the riskiest troves in nominal CR order, up to the first whose cumulative debt exceeds `debt`."""
+    if troves.nicr is None:
+        return np.argsort(nominal_CR(troves), kind='stable')
+    return troves.nicr.riskiest(troves, debt)
+
+
+def redeem_troves(troves, redemption_pool, price_ether):
+    """Redeem `redemption_pool` LUSD against the riskiest troves of the store.
+
+    Every trove whose debt is covered by the cumulative redemption is closed and
+    the residual is taken from the next trove. Returns the number of closed
+    troves and the ether paid out to the redeemers.
+    """
+    order = riskiest(troves, redemption_pool)
+    redempted = np.cumsum(troves['Supply'][order])
+    n_redempt = int(np.searchsorted(redempted, redemption_pool, side='right'))
+    ether_redempted = (redempted[n_redempt - 1] if n_redempt > 0 else 0) / price_ether
+    if n_redempt < len(order):
+        boundary = order[n_redempt]
+        residual = redemption_pool - (redempted[n_redempt - 1] if n_redempt > 0 else 0)
+        troves.update('Supply', troves['Supply'][boundary] - residual, boundary)
+        troves.update('Ether_Quantity', troves['Ether_Quantity'][boundary] - residual / price_ether, boundary)
+        ether_redempted = redemption_pool / price_ether
+    troves.remove(order[:n_redempt])
+    return [n_redempt, ether_redempted]
+
+
+def trigger_prices(troves, slots):
+    """Ether prices below and above which the troves in `slots` leave their inattention band.
+
+    A trove adjusts once its CR leaves [CR_initial*(1-tau), CR_initial*(1+2*tau)]
+    with tau its rational inattention. CR is linear in the ether price, so the
+    band is a fixed range of prices until the trove's debt or collateral
+    changes.
+    """
+    debt_per_ether = troves['Supply'][slots] / troves['Ether_Quantity'][slots]
+    CR_initial, inattention = troves['CR_initial'][slots], troves['Rational_inattention'][slots]
+    return CR_initial * (1 - inattention) * debt_per_ether, CR_initial * (1 + 2 * inattention) * debt_per_ether
+
+
+class TriggerIndex:
+    """Lower and upper trigger prices of a store's troves, each kept sorted with the trove IDs.
+
+    A query pops the entries whose trigger the price has crossed off the ends
+    of the sorted arrays: the lower triggers above the price and the upper
+    triggers below it. Popped troves are returned and re-entered with their
+    trigger prices at that time, whether or not the caller adjusts them.
+
+    The store calls `touch` with the IDs of the troves it opens or updates.
+    Their new trigger prices go to a small unsorted buffer at the next query,
+    and the buffer is merged into the sorted arrays once it grows.
+    Superseded entries stay in place and are dropped when a query pops them.
+    The arrays are rebuilt once such entries outnumber the live troves.
+
+    Below `min_troves` troves a query returns every slot, which is cheaper
+    than the upkeep. Changes are then not tracked, and the index is rebuilt
+    once the store grows past `min_troves`.
+    """
+
+    min_troves = 4096
+    # queries widen the price range by this relative margin, so that rounding
+    # never hides a trove; callers recheck the band exactly
+    margin = 1e-9
+
+    def __init__(self):
+        self._clear()
+        # IDs touched since the last query, or None while changes are not tracked
+        self.pending = None
+
+    def _clear(self):
+        self.low_prices, self.low_ids = np.empty(0), np.empty(0, dtype=np.int64)
+        self.high_prices, self.high_ids = np.empty(0), np.empty(0, dtype=np.int64)
+        self.buffer_ids, self.buffer_low, self.buffer_high = np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+
+    def fork(self):
+        # the arrays are only ever replaced, never written in place, so they can be shared
+        forked = copy.copy(self)
+        if self.pending is not None:
+            forked.pending = list(self.pending)
+        return forked
+
+    def touch(self, ids):
+        if self.pending is not None:
+            self.pending.append(np.atleast_1d(np.asarray(ids, dtype=np.int64)))
+
+    def _merge(self, troves):
+        if self.pending is None or max(len(self.low_ids), len(self.high_ids)) > 2 * len(troves) + 64:
+            # untracked while the store was small, or mostly superseded: rebuild from the live troves
+            self._clear()
+            self.pending = [troves.ids()]
+        if self.pending:
+            ids = np.unique(np.concatenate(self.pending))
+            self.pending = []
+            slots = troves.slots(ids)
+            live = slots >= 0
+            low, high = trigger_prices(troves, slots[live])
+            self.buffer_ids = np.concatenate([self.buffer_ids, ids[live]])
+            self.buffer_low = np.concatenate([self.buffer_low, low])
+            self.buffer_high = np.concatenate([self.buffer_high, high])
+        if len(self.buffer_ids) > max(256, len(self.low_ids) // 32):
+            self.low_prices, self.low_ids = _insert_sorted(self.low_prices, self.low_ids, self.buffer_low, self.buffer_ids)
+            self.high_prices, self.high_ids = _insert_sorted(self.high_prices, self.high_ids, self.buffer_high, self.buffer_ids)
+            self.buffer_ids, self.buffer_low, self.buffer_high = np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+
+    def crossed(self, troves, price_ether):
+        """Ascending slots of the troves whose band may not contain `price_ether`."""
+        if len(troves) < self.min_troves:
+            self.pending = None
+            return np.arange(len(troves))
+        self._merge(troves)
+        low_limit, high_limit = price_ether * (1 - self.margin), price_ether * (1 + self.margin)
+        low = np.searchsorted(self.low_prices, low_limit, side='right')
+        high = np.searchsorted(self.high_prices, high_limit, side='left')
+        in_buffer = (self.buffer_low > low_limit) | (self.buffer_high < high_limit)
+        ids = np.concatenate([self.low_ids[low:], self.high_ids[:high], self.buffer_ids[in_buffer]])
+        prices = np.concatenate([self.low_prices[low:], self.high_prices[:high], self.buffer_low[in_buffer]])
+        is_high = np.zeros(len(ids), dtype=bool)
+        is_high[len(self.low_ids) - low:len(ids) - in_buffer.sum()] = True
+        self.low_prices, self.low_ids = self.low_prices[:low], self.low_ids[:low]
+        self.high_prices, self.high_ids = self.high_prices[high:], self.high_ids[high:]
+        keep = ~in_buffer
+        self.buffer_ids, self.buffer_low, self.buffer_high = self.buffer_ids[keep], self.buffer_low[keep], self.buffer_high[keep]
+
+        slots = troves.slots(ids)
+        live = slots >= 0
+        ids, slots, prices, is_high = ids[live], slots[live], prices[live], is_high[live]
+        # drop the entries that a later change of the trove superseded
+        low_now, high_now = trigger_prices(troves, slots)
+        current = prices == np.where(is_high, high_now, low_now)
+        self.touch(ids[current])
+        return np.unique(slots[current])
+
+
+class NICRIndex:
+    """Nominal collateral ratios of a store's troves, kept sorted with the trove IDs, riskiest first.
+
+    Liquidations cut the troves below a ratio off the front of the sorted
+    arrays and redemptions walk them from the front, so neither scans nor sorts
+    the store. The upkeep follows `TriggerIndex`: the store calls `touch` with
+    the IDs it opens or updates, their new ratios go to an unsorted buffer that
+    is merged in once it grows, superseded entries are dropped when a query
+    pops them, and the arrays are rebuilt once such entries outnumber the live
+    troves. Queries re-enter the live troves they pop, whether or not the
+    caller closes them.
+    """
+
+    def __init__(self):
+        self._clear()
+        # IDs touched since the last query, or None before the first one
+        self.pending = None
+
+    def _clear(self):
+        self.ratios, self.ids = np.empty(0), np.empty(0, dtype=np.int64)
+        self.buffer_ids, self.buffer_ratios = np.empty(0, dtype=np.int64), np.empty(0)
+
+    def fork(self):
+        # the arrays are only ever replaced, never written in place, so they can be shared
+        forked = copy.copy(self)
+        if self.pending is not None:
+            forked.pending = list(self.pending)
+        return forked
+
+    def touch(self, ids):
+        if self.pending is not None:
+            self.pending.append(np.atleast_1d(np.asarray(ids, dtype=np.int64)))
+
+    def _merge(self, troves, flush=False):
+        if self.pending is None or len(self.ids) + len(self.buffer_ids) > 2 * len(troves) + 64:
+            self._clear()
+            self.pending = [troves.ids()]
+        if self.pending:
+            ids = np.unique(np.concatenate(self.pending))
+            self.pending = []
+            slots = troves.slots(ids)
+            live = slots >= 0
+            self.buffer_ids = np.concatenate([self.buffer_ids, ids[live]])
+            self.buffer_ratios = np.concatenate([self.buffer_ratios, nominal_CR(troves, slots[live])])
+        if len(self.buffer_ids) and (flush or len(self.buffer_ids) > max(256, len(self.ids) // 32)):
+            self.ratios, self.ids = _insert_sorted(self.ratios, self.ids, self.buffer_ratios, self.buffer_ids)
+            self.buffer_ids, self.buffer_ratios = np.empty(0, dtype=np.int64), np.empty(0)
+
+    def _current(self, troves, ids, ratios):
+        # slots of the entries, and which of them hold their live trove's current ratio
+        slots = troves.slots(ids)
+        current = slots >= 0
+        current[current] = ratios[current] == nominal_CR(troves, slots[current])
+        return slots, current
+
+    def below(self, troves, limit):
+        """Ascending slots of the troves whose nominal CR is below `limit`."""
+        self._merge(troves)
+        cut = np.searchsorted(self.ratios, limit, side='left')
+        in_buffer = self.buffer_ratios < limit
+        ids = np.concatenate([self.ids[:cut], self.buffer_ids[in_buffer]])
+        ratios = np.concatenate([self.ratios[:cut], self.buffer_ratios[in_buffer]])
+        self.ratios, self.ids = self.ratios[cut:], self.ids[cut:]
+        self.buffer_ids, self.buffer_ratios = self.buffer_ids[~in_buffer], self.buffer_ratios[~in_buffer]
+        slots, current = self._current(troves, ids, ratios)
+        self.touch(ids[current])
+        return np.unique(slots[current])
+
+    def riskiest(self, troves, debt):
+        """Slots of the riskiest troves in nominal CR order, up to the first whose cumulative debt exceeds `debt`."""
+        self._merge(troves, flush=True)
+        n = 64
+        while True:
+            slots, current = self._current(troves, self.ids[:n], self.ratios[:n])
+            positions = np.flatnonzero(current)
+            # a trove touched without a change has several current entries; keep its first
+            _, first = np.unique(self.ids[positions], return_index=True)
+            positions = positions[np.sort(first)]
+            debts = np.cumsum(troves['Supply'][slots[positions]])
+            if n >= len(self.ids) or (len(debts) and debts[-1] > debt):
+                break
+            n *= 4
+        count = min(int(np.searchsorted(debts, debt, side='right')) + 1, len(positions))
+        positions = positions[:count]
+        popped = positions[-1] + 1 if count else 0
+        self.touch(self.ids[:popped][current[:popped]])
+        self.ratios, self.ids = self.ratios[popped:], self.ids[popped:]
+        return slots[positions]
+
+
+def _insert_sorted(prices, ids, new_prices, new_ids):
+    order = np.argsort(new_prices, kind='stable')
+    new_prices, new_ids = new_prices[order], new_ids[order]
+    positions = np.searchsorted(prices, new_prices, side='right')
+    return np.insert(prices, positions, new_prices), np.insert(ids, positions, new_ids)
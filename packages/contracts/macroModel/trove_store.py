@@ -0,0 +1,211 @@
+import os
+
+import numpy as np
+
+from .trove_index import NICRIndex, TriggerIndex
+
+# check the running totals against a full recomputation after every mutation
+DEBUG = bool(os.environ.get('MACRO_MODEL_DEBUG'))
+
+TROVE_DTYPE = np.dtype([('id', np.int64), ('Ether_Quantity', np.float64), ('Supply', np.float64),
+                        ('CR_initial', np.float64), ('Rational_inattention', np.float64)])
+# fields whose sum over the live troves the store keeps as a running total
+TOTALS = {'Supply': 'total_supply', 'Ether_Quantity': 'total_collateral'}
+
+
+class TroveStore:
+    """Open troves in one preallocated structured array.
+
+    The live troves fill slots 0..len-1. Removing a trove moves the last live
+    trove into its slot (swap-remove), so the free slots are always the tail of
+    the array and opening a trove writes the first of them. The array doubles
+    when it is full. Every trove keeps the ID it was opened with; `slots` maps
+    IDs to their current slot, or -1 once the trove is closed.
+
+    The store keeps the total debt (`total_supply`) and collateral
+    (`total_collateral`) of the live troves up to date on every open, remove
+    and `update`, so the aggregates cost O(1) per step. Writes through the
+    views returned by `store[field]` bypass the totals; use `update` for Supply
+    and Ether_Quantity. With `debug` (default: the MACRO_MODEL_DEBUG environment
+    variable), every mutation checks the totals against a recomputation.
+
+    With `triggers`, the store also keeps a `TriggerIndex` of the ether prices
+    at which each trove leaves its inattention band, queried with `crossed`.
+    With `nicr`, it keeps a `NICRIndex` of the troves' nominal collateral
+    ratios, which liquidations and redemptions query instead of scanning.
+
+    `fork` returns a copy that shares the trove arrays with the original until
+    either of them opens, removes or updates a trove (copy-on-write). Shared
+    arrays are read-only, so writes through the views fail instead of leaking
+    into the other copy.
+    """
+
+    def __init__(self, capacity=64, debug=None, triggers=False, nicr=False):
+        self._troves = np.zeros(capacity, dtype=TROVE_DTYPE)
+        self._slots = np.full(capacity, -1, dtype=np.int64)
+        self.length = 0
+        self.next_id = 0
+        self.total_supply = 0.0
+        self.total_collateral = 0.0
+        self.debug = DEBUG if debug is None else debug
+        self.triggers = TriggerIndex() if triggers else None
+        self.nicr = NICRIndex() if nicr else None
+        self._shared = False
+
+    def __getstate__(self):
+        # the free tail is not saved
+        state = self.__dict__.copy()
+        state['_troves'] = self._troves[:self.length].copy()
+        state['_slots'] = self._slots[:self.next_id].copy()
+        state['_shared'] = False
+        return state
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, field):
+        # a view of the live troves, so in-place updates reach the store
+        return self._troves[field][:self.length]
+
+    @property
+    def capacity(self):
+        return len(self._troves)
+
+    def TCR(self, price_ether):
+        """Total collateral ratio of the live troves at `price_ether`."""
+        return price_ether * self.total_collateral / self.total_supply if self.total_supply > 0 else np.inf
+
+    def check_totals(self, rtol=1e-9):
+        """Raise AssertionError if a running total strayed from the sum of its field."""
+        for field, total in TOTALS.items():
+            exact = self[field].sum()
+            if not np.isclose(getattr(self, total), exact, rtol=rtol, atol=1e-6):
+                raise AssertionError(f"running {total} {getattr(self, total)!r} differs from the recomputed {exact!r}")
+
+    def _mutated(self):
+        if self.length == 0:
+            # nothing left to sum: drop the accumulated rounding error
+            self.total_supply = self.total_collateral = 0.0
+        if self.debug:
+            self.check_totals()
+
+    def fork(self):
+        self._troves.flags.writeable = False
+        self._slots.flags.writeable = False
+        self._shared = True
+        # not copy.copy, which would go through __getstate__ and copy the arrays
+        forked = object.__new__(TroveStore)
+        forked.__dict__.update(self.__dict__)
+        if self.triggers is not None:
+            forked.triggers = self.triggers.fork()
+        if self.nicr is not None:
+            forked.nicr = self.nicr.fork()
+        return forked
+
+    def _own(self):
+        # the first mutation after a fork copies the shared arrays
+        if self._shared:
+            self._troves = self._troves.copy()
+            self._slots = self._slots.copy()
+            self._shared = False
+
+    def ids(self):
+        return self['id']
+
+    def slots(self, ids):
+        return self._slots[ids]
+
+    def reserve(self, n_troves, n_ids):
+        """Grow, by at least doubling, so that `n_troves` troves and `n_ids` IDs fit."""
+        if n_troves > self.capacity:
+            extra = max(n_troves, 2 * self.capacity) - self.capacity
+            self._troves = np.concatenate([self._troves, np.zeros(extra, dtype=TROVE_DTYPE)])
+        if n_ids > len(self._slots):
+            extra = max(n_ids, 2 * len(self._slots)) - len(self._slots)
+            self._slots = np.concatenate([self._slots, np.full(extra, -1, dtype=np.int64)])
+
+    def open(self, ether_quantity, supply, CR_initial, rational_inattention):
+        """Open one trove per element of the (broadcast) arguments and return their IDs."""
+        ether_quantity, supply, CR_initial, rational_inattention = np.broadcast_arrays(
+            np.atleast_1d(ether_quantity), supply, CR_initial, rational_inattention)
+        self._own()
+        number = len(ether_quantity)
+        self.reserve(self.length + number, self.next_id + number)
+        ids = np.arange(self.next_id, self.next_id + number)
+        new = self._troves[self.length:self.length + number]
+        new['id'] = ids
+        new['Ether_Quantity'] = ether_quantity
+        new['Supply'] = supply
+        new['CR_initial'] = CR_initial
+        new['Rational_inattention'] = rational_inattention
+        self._slots[ids] = np.arange(self.length, self.length + number)
+        self.length += number
+        self.next_id += number
+        self.total_supply += float(new['Supply'].sum())
+        self.total_collateral += float(new['Ether_Quantity'].sum())
+        if self.triggers is not None:
+            self.triggers.touch(ids)
+        if self.nicr is not None:
+            self.nicr.touch(ids)
+        self._mutated()
+        return ids
+
+    def remove(self, slots):
+        """Close the troves in `slots` (indices or a boolean mask over the live troves)."""
+        slots = np.asarray(slots)
+        if slots.dtype == bool:
+            slots = np.flatnonzero(slots)
+        if len(slots) == 0:
+            return
+        self._own()
+        keep = np.ones(self.length, dtype=bool)
+        keep[slots] = False
+        new_length = self.length - len(slots)
+        # the kept troves past the new end fill the removed slots before it
+        holes = np.flatnonzero(~keep[:new_length])
+        movers = new_length + np.flatnonzero(keep[new_length:])
+        self._slots[self._troves['id'][slots]] = -1
+        self.total_supply -= float(self._troves['Supply'][slots].sum())
+        self.total_collateral -= float(self._troves['Ether_Quantity'][slots].sum())
+        self._troves[holes] = self._troves[movers]
+        self._slots[self._troves['id'][holes]] = holes
+        self.length = new_length
+        self._mutated()
+
+    def update(self, field, values, slots=slice(None)):
+        """Write `values` to `field` of the live troves in `slots` (default: all), keeping the totals."""
+        self._own()
+        column = self[field]
+        every_trove = isinstance(slots, slice) and slots == slice(None)
+        if field in TOTALS and not every_trove:
+            setattr(self, TOTALS[field], getattr(self, TOTALS[field]) + float(np.sum(values - column[slots])))
+        column[slots] = values
+        if field in TOTALS and every_trove:
+            # a rewrite of every trove costs a pass anyway, so resum exactly
+            setattr(self, TOTALS[field], float(column.sum()))
+        if self.triggers is not None:
+            self.triggers.touch(self['id'][slots])
+        if self.nicr is not None and field in TOTALS:
+            self.nicr.touch(self['id'][slots])
+        self._mutated()
+
+    def crossed(self, price_ether):
+        """Ascending slots of the troves that may be out of their inattention band at `price_ether`.
+
+        A superset of the troves out of band, by at most the index's rounding
+        margin; the band still has to be checked on these slots. Without
+        `triggers`, every slot.
+        """
+        if self.triggers is None:
+            return np.arange(len(self))
+        return self.triggers.crossed(self, price_ether)
+
+    def close(self, ids):
+        self.remove(self._slots[ids])
+
+    def to_frame(self, price_ether):
+        import pandas as pd
+        troves = pd.DataFrame(self._troves[:self.length]).set_index('id')
+        troves.insert(0, 'Ether_Price', price_ether)
+        troves['CR_current'] = price_ether * troves['Ether_Quantity'] / troves['Supply']
+        return troves
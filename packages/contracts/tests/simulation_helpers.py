@@ -4,6 +4,7 @@ import numpy as np
 from bisect import bisect_left
 
 from helpers import *
+from macroModel.scenarios import random_walk
 
 #global variables
 day = 24
@@ -15,6 +16,9 @@ period = year
 #n_sim = 8640
 n_sim = year
 
+#seed of the exogenous series
+seed = 2021
+
 # number of liquidations for each call to `liquidateTroves`
 NUM_LIQUIDATIONS = 10
 
@@ -34,7 +38,6 @@ where $\zeta_t^e \sim N(0, $ sd_ether$)$ represents ether price shock and $\sigm
 
 #ether price
 price_ether_initial = 2000
-price_ether = [price_ether_initial]
 sd_ether=0.02
 #drift_ether = 0.001
 # 4 stages:
@@ -64,7 +67,6 @@ The LQTY price from the second month on is endogenously determined.
 
 #LQTY price & airdrop
 price_LQTY_initial = 0.4
-price_LQTY = [price_LQTY_initial]
 sd_LQTY=0.005
 drift_LQTY = 0.0035
 supply_LQTY=[0]
@@ -158,7 +160,6 @@ theta = 0.001
 
 #natural rate
 natural_rate_initial = 0.2
-natural_rate = [natural_rate_initial]
 sd_natural_rate = 0.002
 
 """# Trove pool
@@ -299,31 +300,17 @@ Ether Price
 """
 
 #ether price
-for i in range(1, period1):
-    random.seed(2019375+10000*i)
-    shock_ether = random.normalvariate(0, sd_ether)
-    price_ether.append(price_ether[i-1] * (1 + shock_ether) * (1 + drift_ether1))
+price_ether = random_walk('price_ether', period, price_ether_initial, sd_ether, seed=seed,
+                          drift=[(period1, drift_ether1), (period2, drift_ether2), (period3, drift_ether3), (period4, drift_ether4)])
 print(" - ETH period 1 -")
 print(f"Min ETH price: {min(price_ether[1:period1])}")
 print(f"Max ETH price: {max(price_ether[1:period1])}")
-for i in range(period1, period2):
-    random.seed(2019375+10000*i)
-    shock_ether = random.normalvariate(0, sd_ether)
-    price_ether.append(price_ether[i-1] * (1 + shock_ether) * (1 + drift_ether2))
 print(" - ETH period 2 -")
 print(f"Min ETH price: {min(price_ether[period1:period2])}")
 print(f"Max ETH price: {max(price_ether[period1:period2])}")
-for i in range(period2, period3):
-    random.seed(2019375+10000*i)
-    shock_ether = random.normalvariate(0, sd_ether)
-    price_ether.append(price_ether[i-1] * (1 + shock_ether) * (1 + drift_ether3))
 print(" - ETH period 3 -")
 print(f"Min ETH price: {min(price_ether[period2:period3])}")
 print(f"Max ETH price: {max(price_ether[period2:period3])}")
-for i in range(period3, period4):
-    random.seed(2019375+10000*i)
-    shock_ether = random.normalvariate(0, sd_ether)
-    price_ether.append(price_ether[i-1] * (1 + shock_ether) * (1 + drift_ether4))
 print(" - ETH period 4 -")
 print(f"Min ETH price: {min(price_ether[period3:period4])}")
 print(f"Max ETH price: {max(price_ether[period3:period4])}")
@@ -331,18 +318,12 @@ print(f"Max ETH price: {max(price_ether[period3:period4])}")
 """Natural Rate"""
 
 #natural rate
-for i in range(1, period):
-    random.seed(201597+10*i)
-    shock_natural = random.normalvariate(0,sd_natural_rate)
-    natural_rate.append(natural_rate[i-1]*(1+shock_natural))
+natural_rate = random_walk('natural_rate', period, natural_rate_initial, sd_natural_rate, seed=seed)
 
 """LQTY Price - First Month"""
 
 #LQTY price
-for i in range(1, month):
-    random.seed(2+13*i)
-    shock_LQTY = random.normalvariate(0,sd_LQTY)  
-    price_LQTY.append(price_LQTY[i-1]*(1+shock_LQTY)*(1+drift_LQTY))
+price_LQTY = random_walk('price_LQTY', month, price_LQTY_initial, sd_LQTY, drift_LQTY, seed)
 
 """# Troves
 
@@ -1,8 +1,7 @@
 import pytest
 
-import csv
-
 from brownie import *
+from macroModel.sink import ResultsSink
 from accounts import *
 from helpers import *
 from simulation_helpers import *
@@ -215,9 +214,10 @@ def test_run_simulation(add_accounts, contracts, print_expectations):
 
     logGlobalState(contracts)
 
-    with open('tests/simulation.csv', 'w', newline='') as csvfile:
-        datawriter = csv.writer(csvfile, delimiter=',')
-        datawriter.writerow(['iteration', 'ETH_price', 'price_LUSD', 'price_LQTY', 'num_troves', 'total_coll', 'total_debt', 'TCR', 'recovery_mode', 'last_ICR', 'SP_LUSD', 'SP_ETH', 'total_coll_added', 'total_coll_liquidated', 'total_lusd_redempted'])
+    schema = {'ETH_price': 'float64', 'price_LUSD': 'float64', 'price_LQTY': 'float64', 'num_troves': 'int64', 'total_coll': 'float64',
+              'total_debt': 'float64', 'TCR': 'float64', 'recovery_mode': 'bool', 'last_ICR': 'float64', 'SP_LUSD': 'float64', 'SP_ETH': 'float64',
+              'total_coll_added': 'float64', 'total_coll_liquidated': 'float64', 'total_lusd_redempted': 'float64'}
+    with ResultsSink('tests/simulation.parquet', schema) as sink:
 
         #Simulation Process
         for index in range(1, n_sim):
@@ -269,6 +269,9 @@ def test_run_simulation(add_accounts, contracts, print_expectations):
             print(f'Ratio ETH liquid {100 * total_coll_liquidated / total_coll_added}%')
             print(' ----------------------\n')
 
-            datawriter.writerow([index, ETH_price, price_LUSD, price_LQTY_current, num_troves, total_coll, total_debt, TCR, recovery_mode, last_ICR, SP_LUSD, SP_ETH, total_coll_added, total_coll_liquidated, total_lusd_redempted])
+            sink.write(index, {'ETH_price': ETH_price, 'price_LUSD': price_LUSD, 'price_LQTY': price_LQTY_current, 'num_troves': num_troves,
+                               'total_coll': total_coll, 'total_debt': total_debt, 'TCR': TCR, 'recovery_mode': recovery_mode, 'last_ICR': last_ICR,
+                               'SP_LUSD': SP_LUSD, 'SP_ETH': SP_ETH, 'total_coll_added': total_coll_added,
+                               'total_coll_liquidated': total_coll_liquidated, 'total_lusd_redempted': total_lusd_redempted})
 
             assert price_LUSD > 0